@@ -0,0 +1,183 @@
+import argparse
+import csv
+import multiprocessing
+import sys
+import threading
+import time
+
+import chess
+import chess.pgn
+
+from chess_ai import ChessBot, MATE_SCORE, MAX_MATE_PLY, SEARCH_DEPTHS
+from position_cache import PositionCache
+
+# Bulk annotation of PGN archives: every ply of every game gets the engine's
+# best move and score. Games are streamed one at a time with read_game, their
+# positions are fanned out to a process pool, and results are reassembled
+# per game in order.
+
+MAX_PENDING = 2048       # Positions in flight before the reader waits
+PROGRESS_INTERVAL = 2.0  # Seconds between progress lines
+
+_bot = None
+
+
+def _init_worker(level, cache_path):
+    global _bot
+    _bot = ChessBot(level, PositionCache(cache_path) if cache_path else None)
+
+
+def analyze_position(task):
+    game_idx, ply, fen = task
+    board = chess.Board(fen)
+    if board.is_game_over():
+        return game_idx, ply, None, _bot.evaluate_board(board), 0, False
+    move = _bot.get_move(board)
+    return game_idx, ply, move, _bot.last_score, _bot.nodes, _bot.last_cached
+
+
+def read_games(pgn_path):
+    with open(pgn_path, encoding="utf-8", errors="replace") as f:
+        while True:
+            game = chess.pgn.read_game(f)
+            if game is None:
+                break
+            yield game
+
+
+class Progress:
+    def __init__(self, out=sys.stderr):
+        self.out = out
+        self.start = time.perf_counter()
+        self.last_report = self.start
+        self.games = 0
+        self.positions = 0
+        self.cache_hits = 0
+        self.nodes = 0
+
+    def add(self, nodes, hit):
+        self.positions += 1
+        self.nodes += nodes
+        self.cache_hits += hit
+        now = time.perf_counter()
+        if now - self.last_report >= PROGRESS_INTERVAL:
+            self.last_report = now
+            self.report()
+
+    def report(self, final=False):
+        elapsed = max(time.perf_counter() - self.start, 1e-9)
+        hit_rate = 100.0 * self.cache_hits / self.positions if self.positions else 0.0
+        label = "done" if final else "progress"
+        print(f"[{label}] games={self.games} positions={self.positions} "
+              f"{self.positions / elapsed:.1f} pos/s {self.nodes / elapsed:.0f} nps "
+              f"cache={hit_rate:.1f}% elapsed={elapsed:.1f}s", file=self.out)
+
+
+def analyze_file(pgn_path, level="hard", processes=None, cache_path="position_cache.db",
+                 on_game=None, progress=None):
+    """Annotates every game of a PGN file and calls on_game(game, results) for each, in file order.
+
+    results is a list of (played_move, best_move, score) per ply, score in
+    centipawns from White's point of view.
+    """
+    if level not in SEARCH_DEPTHS:
+        raise ValueError(f"analysis needs a searching level, one of {sorted(SEARCH_DEPTHS)}")
+    progress = progress or Progress()
+    window = threading.BoundedSemaphore(MAX_PENDING)
+    games = {}
+
+    def tasks():
+        for game_idx, game in enumerate(read_games(pgn_path)):
+            board = game.board()
+            moves = list(game.mainline_moves())
+            games[game_idx] = (game, moves, [None] * len(moves))
+            for ply, move in enumerate(moves):
+                window.acquire()
+                yield game_idx, ply, board.fen()
+                board.push(move)
+
+    next_game = 0
+    with multiprocessing.Pool(processes, _init_worker, (level, cache_path)) as pool:
+        for game_idx, ply, move, score, nodes, hit in pool.imap(analyze_position, tasks(), chunksize=16):
+            window.release()
+            game, moves, results = games[game_idx]
+            results[ply] = (moves[ply], move, score)
+            progress.add(nodes, hit)
+
+            # imap keeps task order, so games complete in file order
+            while next_game in games and None not in games[next_game][2]:
+                game, moves, results = games.pop(next_game)
+                progress.games += 1
+                if on_game:
+                    on_game(game, results)
+                next_game += 1
+
+    # Games without moves never produce a task
+    for game_idx in sorted(games):
+        progress.games += 1
+        if on_game:
+            on_game(games[game_idx][0], [])
+    progress.report(final=True)
+
+
+def format_eval(score):
+    if score is None:
+        return None
+    if abs(score) >= MATE_SCORE - MAX_MATE_PLY:
+        # Mate scores count plies to the mate; #N counts the mating side's moves
+        moves = (MATE_SCORE - abs(score) + 1) // 2
+        return f"#{moves}" if score > 0 else f"#-{moves}"
+    return f"{score / 100:.2f}"
+
+
+def annotate_game(game, results):
+    node = game
+    board = game.board()
+    for played, best, score in results:
+        node = node.variation(played)
+        comments = []
+        ev = format_eval(score)
+        if ev is not None:
+            comments.append(f"[%eval {ev}]")
+        if best is not None and best != played:
+            comments.append(f"best {board.san(best)}")
+        node.comment = " ".join(comments)
+        board.push(played)
+    return game
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Annotate PGN games with ChessBot evals and best moves.")
+    parser.add_argument("pgn", help="input PGN file")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=["pgn", "csv"], default="pgn")
+    parser.add_argument("--level", choices=sorted(SEARCH_DEPTHS), default="hard")
+    parser.add_argument("-j", "--processes", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--cache", default="position_cache.db", help="shared position cache ('' to disable)")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "pgn":
+            exporter = chess.pgn.FileExporter(out)
+
+            def on_game(game, results):
+                annotate_game(game, results).accept(exporter)
+        else:
+            writer = csv.writer(out)
+            writer.writerow(["game", "ply", "played", "best", "score"])
+            game_counter = iter(range(sys.maxsize))
+
+            def on_game(game, results):
+                game_idx = next(game_counter)
+                for ply, (played, best, score) in enumerate(results):
+                    writer.writerow([game_idx, ply, played.uci(), best.uci() if best else "", score])
+
+        analyze_file(args.pgn, args.level, args.processes, args.cache or None, on_game)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import argparse
+import random
+import time
+
+import numpy as np
+import chess
+
+from chess_ai import ChessBot
+
+# Vectorized version of ChessBot's static evaluation for large batches.
+# Positions are stored as 12 bitboards each (white P N B R Q K, then black).
+# The score is the dot product of the (N, 12, 64) 0/1 tensor with a (12, 64)
+# weight matrix holding material + piece-square values. For bulk scoring the
+# same dot product is factored per byte: each of the 96 bitboard bytes indexes
+# a 256-entry table of partial sums, so the tensor never has to be built.
+
+PIECE_TYPES = [chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING]
+CHUNK_SIZE = 65536  # Positions scored per step, bounds temporary memory
+
+
+def board_bitboards(board):
+    white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+    masks = [board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings]
+    return [m & white for m in masks] + [m & black for m in masks]
+
+
+def boards_to_bitboards(boards):
+    """(N, 12) uint64 array, the compact form used for storage and batching."""
+    return np.array([board_bitboards(b) for b in boards], dtype=np.uint64).reshape(-1, 12)
+
+
+def bitboards_to_tensor(bitboards):
+    """Expands (N, 12) bitboards to an int8 (N, 12, 64) tensor indexed by chess.SQUARES."""
+    as_bytes = np.ascontiguousarray(bitboards, dtype="<u8").view(np.uint8)
+    bits = np.unpackbits(as_bytes.reshape(-1, 12, 8), axis=-1, bitorder="little")
+    return bits.view(np.int8)
+
+
+def boards_to_tensor(boards):
+    return bitboards_to_tensor(boards_to_bitboards(boards))
+
+
+def weight_matrix(bot=None):
+    """(12, 64) int32 weights so that tensor . weights == ChessBot.material_score."""
+    bot = bot or ChessBot()
+    weights = np.zeros((12, 64), dtype=np.int32)
+    for i, piece_type in enumerate(PIECE_TYPES):
+        table = np.array(bot.piece_tables[piece_type], dtype=np.int32)
+        squares = np.arange(64)
+        # Tables are written from White's side with a8 first
+        weights[i] = bot.piece_values[piece_type] + table[squares ^ 56]
+        weights[6 + i] = -(bot.piece_values[piece_type] + table[squares])
+    return weights
+
+
+def tensor_scores(tensor, weights=None):
+    """Dot product of an (N, 12, 64) tensor with the weight matrix."""
+    if weights is None:
+        weights = weight_matrix()
+    return np.tensordot(tensor.astype(np.int32), weights, axes=([1, 2], [0, 1])).astype(np.int32)
+
+
+def byte_tables(weights):
+    """(96, 256) partial sums: entry [k, v] is the weight of byte k of the bitboards holding value v."""
+    bits = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1, bitorder="little").astype(np.int32)
+    return np.einsum("vb,pkb->pkv", bits, weights.reshape(12, 8, 8)).reshape(96, 256)
+
+
+def static_scores(bitboards, weights=None):
+    """Material + PST score (White's point of view) for every position, as int32."""
+    if weights is None:
+        weights = weight_matrix()
+    table = byte_tables(weights).reshape(-1)
+    offsets = np.arange(96, dtype=np.intp) * 256
+    as_bytes = np.ascontiguousarray(bitboards, dtype="<u8").view(np.uint8).reshape(-1, 96)
+    scores = np.empty(len(as_bytes), dtype=np.int32)
+    for start in range(0, len(as_bytes), CHUNK_SIZE):
+        chunk = as_bytes[start:start + CHUNK_SIZE]
+        scores[start:start + len(chunk)] = table[chunk + offsets].sum(axis=1, dtype=np.int32)
+    return scores
+
+
+def evaluate_boards(boards, bot=None):
+    """Same values as ChessBot.evaluate_board for a list of boards.
+
+    The material/PST part is vectorized; terminal checks and mobility still need
+    move generation and are added per board.
+    """
+    bot = bot or ChessBot()
+    scores = static_scores(boards_to_bitboards(boards), weight_matrix(bot)).astype(np.int64)
+    for i, board in enumerate(boards):
+        if board.is_checkmate():
+            scores[i] = -99999 if board.turn else 99999
+        elif board.is_stalemate() or board.is_insufficient_material():
+            scores[i] = 0
+        else:
+            mobility = board.legal_moves.count() * 2
+            scores[i] += mobility if board.turn == chess.WHITE else -mobility
+    return scores
+
+
+def random_positions(count, seed=0):
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(0, 80)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        boards.append(board)
+    return boards
+
+
+def benchmark(n, sample=5000):
+    bot = ChessBot()
+    boards = random_positions(sample)
+
+    start = time.perf_counter()
+    expected = [bot.material_score(b) for b in boards]
+    loop_rate = sample / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    bitboards = boards_to_bitboards(boards)
+    convert_rate = sample / (time.perf_counter() - start)
+
+    weights = weight_matrix(bot)
+    expected = np.array(expected)
+    mismatches = int(np.count_nonzero(static_scores(bitboards, weights) != expected))
+    mismatches += int(np.count_nonzero(tensor_scores(bitboards_to_tensor(bitboards), weights) != expected))
+
+    # Tile the sample up to n positions for the vectorized timing
+    big = np.tile(bitboards, (n // sample + 1, 1))[:n]
+    start = time.perf_counter()
+    static_scores(big, weights)
+    batch_time = time.perf_counter() - start
+
+    print(f"positions:          {n:,}")
+    print(f"mismatches:         {mismatches} / {sample:,} vs ChessBot.material_score (both paths)")
+    print(f"python loop:        {loop_rate:,.0f} pos/s ({n / loop_rate:.1f}s for {n:,})")
+    print(f"board->bitboards:   {convert_rate:,.0f} pos/s")
+    print(f"vectorized scoring: {n / batch_time:,.0f} pos/s ({batch_time:.2f}s for {n:,})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark vectorized batch evaluation.")
+    parser.add_argument("-n", "--positions", type=int, default=1_000_000)
+    args = parser.parse_args()
+    benchmark(args.positions)
@@ -1,5 +1,13 @@
 import chess
+import functools
+import hashlib
+import json
+import os
 import random
+import time
+
+from mate_search import MateSearch, MATE_NODES
+from search_board import SearchBoard
 
 # --- Piece-Square Tables (Simplified) ---
 # Positive values incentivize occupying those squares
@@ -70,53 +78,294 @@ KING_TABLE_MID = [
     20, 30, 10,  0,  0, 10, 30, 20
 ]
 
+PIECE_TABLES = {
+    chess.PAWN: PAWN_TABLE,
+    chess.KNIGHT: KNIGHT_TABLE,
+    chess.BISHOP: BISHOP_TABLE,
+    chess.ROOK: ROOK_TABLE,
+    chess.QUEEN: QUEEN_TABLE,
+    chess.KING: KING_TABLE_MID
+}
+
+PIECE_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 320,
+    chess.BISHOP: 330,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 20000
+}
+
+# Checkmate scores: MATE_SCORE minus the plies from the search root to the
+# mate, so shorter mates score higher and the distance can be read back
+MATE_SCORE = 99999
+MAX_MATE_PLY = 1000
+# Bumped when scores change meaning, so cached scores from older versions are not reused
+SCORE_VERSION = 2
+
+# Tuned values written by texel_tune.py; the tables above are used when it doesn't exist
+WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_weights.json")
+
+# Search depth per difficulty ("easy" plays random moves)
+SEARCH_DEPTHS = {
+    "medium": 2,
+    "hard": 3,
+    "absolute": 4
+}
+
+@functools.lru_cache(maxsize=None)
+def _read_weights(path):
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    piece_values = dict(PIECE_VALUES)
+    piece_tables = dict(PIECE_TABLES)
+    for symbol, value in data["piece_values"].items():
+        piece_values[chess.Piece.from_symbol(symbol).piece_type] = value
+    for symbol, rows in data["piece_tables"].items():
+        # Written as 8 rows from White's side, a8 first, like the tables above
+        table = [value for row in rows for value in row]
+        if len(table) != 64:
+            raise ValueError(f"{path}: table for {symbol} has {len(table)} squares")
+        piece_tables[chess.Piece.from_symbol(symbol).piece_type] = table
+    return piece_values, piece_tables
+
+
+def load_weights(path=WEIGHTS_PATH):
+    """(piece_values, piece_tables) from a weights file, or the built-in ones if there is none."""
+    if not path or not os.path.exists(path):
+        return dict(PIECE_VALUES), dict(PIECE_TABLES)
+    piece_values, piece_tables = _read_weights(path)
+    return dict(piece_values), dict(piece_tables)
+
+
+def weights_key(piece_values, piece_tables):
+    # 64-bit fingerprint of an evaluation, so cached scores are only reused
+    # by bots that evaluate positions the same way
+    data = json.dumps([SCORE_VERSION, sorted(piece_values.items()), sorted(piece_tables.items())])
+    return int.from_bytes(hashlib.blake2b(data.encode(), digest_size=8).digest(), "big")
+
+
+# Levels that look for a forced mate with checks before the full-width search
+MATE_SEARCH_LEVELS = ("absolute",)
+MATE_TIME_SHARE = 0.25  # Part of a move's time/node budget the mate search may use
+
+class SearchAborted(Exception):
+    # Raised inside the search when a node or time budget runs out
+    pass
+
 class ChessBot:
-    def __init__(self, level="easy"):
+    def __init__(self, level="easy", cache=None):
         self.level = level
-        self.piece_values = {
-            chess.PAWN: 100,
-            chess.KNIGHT: 320,
-            chess.BISHOP: 330,
-            chess.ROOK: 500,
-            chess.QUEEN: 900,
-            chess.KING: 20000
-        }
+        self.depth = SEARCH_DEPTHS.get(level)
+        # Optional PositionCache shared across sessions and processes
+        self.cache = cache
+        self.use_weights(WEIGHTS_PATH)
+        # Search statistics of the most recent get_move call
+        self.nodes = 0
+        self.last_score = None
+        self.last_cached = False
+        self.last_stats = {}
+        # Optional search budgets; when set the search deepens iteratively
+        # and returns the best move of the last completed depth
+        self.time_limit = None
+        self.node_limit = None
+        self.completed_depth = 0
+        self.stop_time = None
+        self.next_check = float('inf')
+        # Earlier position hashes (newest first) for boards that come without
+        # a move stack, e.g. decoded position_codec snapshots
+        self.history = None
+        # Move ordering memory of the current get_move/analyse call: the best
+        # move found per position hash, and up to two quiet moves per ply that
+        # caused a beta cutoff
+        self.hash_moves = {}
+        self.killers = {}
+        # Proof-number mate search run before alpha-beta, with its own node budget
+        self.mate_search = level in MATE_SEARCH_LEVELS
+        self.mate_nodes = MATE_NODES
+
+    def use_weights(self, path):
+        # Material and piece-square values from a texel_tune.py weights file
+        # (a false path selects the built-in tables)
+        self.piece_values, self.piece_tables = load_weights(path)
+        self.weights_key = weights_key(self.piece_values, self.piece_tables)
 
     def get_move(self, board):
+        self.nodes = 0
+        self.last_score = None
+        self.last_cached = False
+        self.completed_depth = 0
+        self.hash_moves = {}
+        self.killers = {}
+        start = time.perf_counter()
+        # One deadline for the whole move, shared by the mate search and alpha-beta
+        self.stop_time = start + self.time_limit if self.time_limit else None
+        try:
+            move = self.choose_move(board)
+        finally:
+            self.stop_time = None
+        self.record_stats(start)
+        return move
+
+    def get_hint(self, board):
+        # Hints try the mate search first whatever the level
+        line = None if self.mate_search else self.find_mate(board)
+        return line[0] if line else self.get_move(board)
+
+    def find_mate(self, board):
+        # Forced mate line (chess.Moves) for the side to move, or None. Inside
+        # get_move it spends part of the move's time and node budgets, and
+        # alpha-beta gets whatever is left.
+        time_limit = None
+        if self.stop_time:
+            time_limit = max(0.0, self.stop_time - time.perf_counter()) * MATE_TIME_SHARE
+        node_limit = self.mate_nodes
+        if self.node_limit:
+            node_limit = min(node_limit, int(max(0, self.node_limit - self.nodes) * MATE_TIME_SHARE))
+        search = MateSearch(node_limit, time_limit)
+        line = search.search(board, self.history)
+        self.nodes += search.nodes
+        return line
+
+    def analyse(self, board, multipv=3, depth=None):
+        # Top `multipv` root moves with exact scores (White's point of view), best first
+        self.nodes = 0
+        self.last_score = None
+        self.last_cached = False
+        self.hash_moves = {}
+        self.killers = {}
+        depth = depth or self.depth or SEARCH_DEPTHS["medium"]
+        start = time.perf_counter()
+        lines = self.minimax_root_multipv(board, depth, board.turn, multipv)
+        self.completed_depth = depth
+        if lines:
+            self.last_score = lines[0][1]
+        self.record_stats(start)
+        return lines
+
+    def record_stats(self, start):
+        elapsed = time.perf_counter() - start
+        self.last_stats = {
+            "level": self.level,
+            "depth": self.completed_depth,
+            "nodes": self.nodes,
+            "score": self.last_score,
+            "cached": self.last_cached,
+            "time": round(elapsed, 4),
+            "nps": int(self.nodes / elapsed) if elapsed > 0 else 0
+        }
+
+    def choose_move(self, board):
         legal_moves = list(board.legal_moves)
         if not legal_moves:
             return None
 
         # Adjusted depths for proper difficulty progression
-        if self.level == "easy":
+        depth = self.depth
+        if depth is None:
             return random.choice(legal_moves)
-        elif self.level == "medium":
-            return self.minimax_root(board, depth=2, is_maximizing=board.turn)
-        elif self.level == "hard":
-            return self.minimax_root(board, depth=3, is_maximizing=board.turn)
-        elif self.level == "absolute":
-            return self.minimax_root(board, depth=4, is_maximizing=board.turn)
+
+        if self.mate_search:
+            line = self.find_mate(board)
+            if line:
+                self.last_score = MATE_SCORE - len(line) if board.turn == chess.WHITE else len(line) - MATE_SCORE
+                self.completed_depth = len(line)
+                return line[0]
+
+        if self.cache is not None:
+            hit = self.cache.get(board, depth, self.weights_key)
+            if hit and hit[0] in legal_moves:
+                self.last_cached = True
+                self.last_score = hit[1]
+                return hit[0]
+
+        if self.time_limit or self.node_limit:
+            move = self.budgeted_search(board, depth)
         else:
-            return random.choice(legal_moves)
+            move = self.minimax_root(board, depth=depth, is_maximizing=board.turn)
+            self.completed_depth = depth
+        if self.cache is not None and self.last_score is not None and self.completed_depth == depth:
+            self.cache.put(board, depth, move, self.last_score, self.weights_key)
+        return move
+
+    def budgeted_search(self, board, depth):
+        # self.stop_time was set by get_move and may already be partly used
+        self.next_check = 0
+        best_move, best_score = None, None
+        try:
+            for d in range(1, depth + 1):
+                move = self.minimax_root(board, depth=d, is_maximizing=board.turn)
+                best_move, best_score = move, self.last_score
+                self.completed_depth = d
+        except SearchAborted:
+            # The search ran on its own SearchBoard, so `board` is untouched
+            pass
+        finally:
+            self.next_check = float('inf')
+
+        if best_move is None:
+            # Not even depth 1 finished: fall back to the best-looking move
+            search = self.search_board(board)
+            best_move = search.to_move(max(search.generate_moves(), key=lambda m: self.move_ordering_score(search, m)))
+        self.last_score = best_score
+        return best_move
+
+    def check_limits(self):
+        if self.node_limit and self.nodes >= self.node_limit:
+            raise SearchAborted()
+        if self.stop_time and time.perf_counter() >= self.stop_time:
+            raise SearchAborted()
+        self.next_check = self.nodes + 256
+        if self.node_limit:
+            self.next_check = min(self.next_check, self.node_limit)
+
+    def square_values(self):
+        # [color][piece_type][square] material + piece-square values as signed
+        # contributions to material_score, for SearchBoard's incremental score
+        values = [[None] * 7, [None] * 7]
+        for piece_type, table in self.piece_tables.items():
+            material = self.piece_values[piece_type]
+            # Tables are written from White's side with a8 first
+            values[chess.WHITE][piece_type] = [material + table[sq ^ 56] for sq in chess.SQUARES]
+            values[chess.BLACK][piece_type] = [-(material + table[sq]) for sq in chess.SQUARES]
+        return values
+
+    def search_board(self, board):
+        return SearchBoard(board, self.square_values(), self.history)
 
     def evaluate_board(self, board):
-        if board.is_checkmate():
-            return -99999 if board.turn else 99999
-        if board.is_stalemate() or board.is_insufficient_material():
+        search = SearchBoard(board.copy(stack=False), self.square_values())
+        return self.evaluate_moves(search, search.generate_moves())
+
+    def evaluate_moves(self, board, moves):
+        # evaluate_board for a SearchBoard node whose legal moves are already
+        # generated; no moves means mate or stalemate
+        if not moves:
+            if board.is_check():
+                mate = MATE_SCORE - board.ply()
+                return -mate if board.turn else mate
+            return 0
+        if board.is_insufficient_material():
             return 0
         
+        # Same as material_score(), kept up to date by make/unmake
+        score = board.score
+
+        # Mobility Bonus
+        mobility = len(moves)
+        if board.turn == chess.WHITE:
+            score += mobility * 2
+        else:
+            score -= mobility * 2
+            
+        return score
+
+    def material_score(self, board):
+        # Static material + piece-square terms from White's point of view
         score = 0
-        piece_map = {
-            chess.PAWN: (100, PAWN_TABLE),
-            chess.KNIGHT: (320, KNIGHT_TABLE),
-            chess.BISHOP: (330, BISHOP_TABLE),
-            chess.ROOK: (500, ROOK_TABLE),
-            chess.QUEEN: (900, QUEEN_TABLE),
-            chess.KING: (20000, KING_TABLE_MID)
-        }
-        
         for square, piece in board.piece_map().items():
-            material, table = piece_map[piece.piece_type]
+            material = self.piece_values[piece.piece_type]
+            table = self.piece_tables[piece.piece_type]
             rank = chess.square_rank(square)
             file = chess.square_file(square)
             
@@ -131,30 +380,23 @@ class ChessBot:
                 table_index = (7 - m_rank) * 8 + m_file
                 pos_bonus = table[table_index] if table else 0
                 score -= (material + pos_bonus)
-
-        # Mobility Bonus
-        mobility = board.legal_moves.count()
-        if board.turn == chess.WHITE:
-            score += mobility * 2
-        else:
-            score -= mobility * 2
-            
         return score
 
     def move_ordering_score(self, board, move):
+        # Moves here are SearchBoard ints: from | to << 6 | promotion << 12
         score = 0
-        piece_type = board.piece_at(move.from_square).piece_type
+        piece_type = board.types[move & 63]
         
         # MVV-LVA: capturing a high value piece with a low value one
         if board.is_capture(move):
-            victim = board.piece_at(move.to_square)
+            victim = board.types[move >> 6 & 63]
             if victim:
-                score += 100 * self.piece_values[victim.piece_type] - self.piece_values[piece_type]
+                score += 100 * self.piece_values[victim] - self.piece_values[piece_type]
             else: # En passant
                 score += 100
         
         # Promotion is good
-        if move.promotion:
+        if move >> 12:
             score += 900
             
         if board.gives_check(move):
@@ -169,13 +411,16 @@ class ChessBot:
         alpha = -float('inf')
         beta = float('inf')
         
-        moves = list(board.legal_moves)
-        moves.sort(key=lambda m: self.move_ordering_score(board, m), reverse=True)
+        search = self.search_board(board)
+        # The previous iteration's best move goes first
+        hash_move = self.hash_moves.get(search.key)
+        moves = list(search.generate_moves())
+        moves.sort(key=lambda m: (m == hash_move, self.move_ordering_score(search, m)), reverse=True)
         
         for move in moves:
-            board.push(move)
-            value = self.minimax(board, depth - 1, alpha, beta, not is_maximizing)
-            board.pop()
+            undo = search.make(move)
+            value = self.minimax(search, depth - 1, alpha, beta, not is_maximizing)
+            search.unmake(move, undo)
             
             if is_maximizing:
                 if value > best_eval:
@@ -191,11 +436,79 @@ class ChessBot:
             if beta <= alpha:
                 break
         
-        return best_move if best_move else (random.choice(moves) if moves else None)
+        # Root score from White's point of view
+        self.last_score = best_eval if best_move else None
+        if best_move:
+            self.hash_moves[search.key] = best_move
+            return search.to_move(best_move)
+        return search.to_move(random.choice(moves)) if moves else None
+
+    def minimax_root_multipv(self, board, depth, is_maximizing, k):
+        # Like minimax_root, but keeps the k best moves. Once k moves are known,
+        # the k-th best score is the bound: a move that fails to beat it is
+        # dropped, one that beats it was searched with an open window and has
+        # an exact score.
+        lines = []
+        search = self.search_board(board)
+        moves = list(search.generate_moves())
+        moves.sort(key=lambda m: self.move_ordering_score(search, m), reverse=True)
+
+        for move in moves:
+            bound = lines[-1][1] if len(lines) >= k else None
+            alpha, beta = -float('inf'), float('inf')
+            if bound is not None:
+                if is_maximizing: alpha = bound
+                else: beta = bound
+
+            undo = search.make(move)
+            value = self.minimax(search, depth - 1, alpha, beta, not is_maximizing)
+            search.unmake(move, undo)
+
+            if bound is None or (value > bound if is_maximizing else value < bound):
+                lines.append((move, value))
+                lines.sort(key=lambda line: line[1], reverse=is_maximizing)
+                del lines[k:]
+        return [(search.to_move(move), value) for move, value in lines]
+
+    def ordered_moves(self, board, key):
+        # Staged move picker: the hash move, then captures best first, then
+        # the killers, then the remaining quiet moves. A stage is generated
+        # only if the moves before it did not cut off.
+        hash_move = self.hash_moves.get(key)
+        if hash_move is not None and board.is_legal(hash_move):
+            yield hash_move
+
+        captures = [m for m in board.generate_captures() if m != hash_move]
+        captures.sort(key=lambda m: self.move_ordering_score(board, m), reverse=True)
+        yield from captures
+
+        killers = self.killers.get(len(board.keys), ())
+        for move in killers:
+            if move != hash_move and board.is_legal(move) and not board.is_capture(move):
+                yield move
 
-    def quiescence(self, board, alpha, beta, is_maximizing):
-        # Tactical search for captures to avoid the horizon effect
-        stand_pat = self.evaluate_board(board)
+        # En passant is generated with the captures even though its target square is empty
+        quiet_mask = chess.BB_ALL & ~board.occ[board.turn ^ 1]
+        quiets = [m for m in board.generate_moves(chess.BB_ALL, quiet_mask)
+                  if m != hash_move and m not in killers and not board.is_en_passant(m)]
+        quiets.sort(key=lambda m: self.move_ordering_score(board, m), reverse=True)
+        yield from quiets
+
+    def store_killer(self, board, move):
+        # Killers are kept per ply, which is the length of the key stack
+        killers = self.killers.setdefault(len(board.keys), [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[2:]
+
+    def quiescence(self, board, alpha, beta, is_maximizing, moves=None):
+        # Tactical search for captures to avoid the horizon effect. Captures
+        # reset the halfmove clock, so no repetition checks are needed here.
+        self.nodes += 1
+        if self.nodes >= self.next_check: self.check_limits()
+        if moves is None:
+            moves = board.generate_moves()
+        stand_pat = self.evaluate_moves(board, moves)
         
         if is_maximizing:
             if stand_pat >= beta: return beta
@@ -205,13 +518,13 @@ class ChessBot:
             if beta > stand_pat: beta = stand_pat
 
         # Only search captures in quiescence
-        moves = [m for m in board.legal_moves if board.is_capture(m)]
+        moves = [m for m in moves if board.is_capture(m)]
         moves.sort(key=lambda m: self.move_ordering_score(board, m), reverse=True)
         
         for move in moves:
-            board.push(move)
+            undo = board.make(move)
             score = self.quiescence(board, alpha, beta, not is_maximizing)
-            board.pop()
+            board.unmake(move, undo)
             
             if is_maximizing:
                 if score >= beta: return beta
@@ -223,35 +536,50 @@ class ChessBot:
         return alpha if is_maximizing else beta
 
     def minimax(self, board, depth, alpha, beta, is_maximizing):
-        if board.is_game_over():
-            return self.evaluate_board(board)
-        
+        self.nodes += 1
+        if self.nodes >= self.next_check: self.check_limits()
         if depth == 0:
-            return self.quiescence(board, alpha, beta, is_maximizing)
+            # One move generation serves the terminal checks, the evaluation
+            # and the captures of the quiescence search
+            moves = board.generate_moves()
+            if not moves or board.is_insufficient_material() or board.is_draw_by_rule():
+                return self.evaluate_moves(board, moves)
+            return self.quiescence(board, alpha, beta, is_maximizing, moves)
 
-        moves = list(board.legal_moves)
-        # Sorting at every level significantly improves alpha-beta pruning efficiency
-        moves.sort(key=lambda m: self.move_ordering_score(board, m), reverse=True)
-        
+        if board.is_insufficient_material() or board.is_draw_by_rule():
+            return self.evaluate_moves(board, board.generate_moves())
+
+        # Ordering moves at every level significantly improves alpha-beta
+        # pruning; most nodes cut off within the first stages of the picker
+        key = board.key
+        best_move = None
         if is_maximizing:
-            max_eval = -float('inf')
-            for move in moves:
-                board.push(move)
+            best_eval = -float('inf')
+            for move in self.ordered_moves(board, key):
+                undo = board.make(move)
                 eval = self.minimax(board, depth - 1, alpha, beta, False)
-                board.pop()
-                max_eval = max(max_eval, eval)
+                board.unmake(move, undo)
+                if eval > best_eval:
+                    best_eval, best_move = eval, move
                 alpha = max(alpha, eval)
                 if beta <= alpha:
                     break
-            return max_eval
         else:
-            min_eval = float('inf')
-            for move in moves:
-                board.push(move)
+            best_eval = float('inf')
+            for move in self.ordered_moves(board, key):
+                undo = board.make(move)
                 eval = self.minimax(board, depth - 1, alpha, beta, True)
-                board.pop()
-                min_eval = min(min_eval, eval)
+                board.unmake(move, undo)
+                if eval < best_eval:
+                    best_eval, best_move = eval, move
                 beta = min(beta, eval)
                 if beta <= alpha:
                     break
-            return min_eval
\ No newline at end of file
+
+        if best_move is None:
+            # No legal moves: checkmate or stalemate
+            return self.evaluate_moves(board, [])
+        if beta <= alpha and not board.is_capture(best_move):
+            self.store_killer(board, best_move)
+        self.hash_moves[key] = best_move
+        return best_eval
\ No newline at end of file
@@ -123,6 +123,46 @@ self.onmessage = function(e) {
 };
 `;
 
+// ===== LOCAL ENGINE SERVICE (optional) =====
+// When engine_server.py runs on this machine, AI requests go to its warm
+// Python workers instead of cold-starting a Blob worker each time.
+const ENGINE_SERVICE_URL = 'http://127.0.0.1:8765';
+let engineServiceUp = false;
+fetch(ENGINE_SERVICE_URL + '/health').then(r => { engineServiceUp = r.ok; }).catch(() => {});
+
+function createBlobWorker() {
+    const blob = new Blob([AI_WORKER_CODE], { type: 'application/javascript' });
+    const url = URL.createObjectURL(blob);
+    const worker = new Worker(url);
+    URL.revokeObjectURL(url);
+    return worker;
+}
+
+// Same postMessage / onmessage / terminate surface as a Worker
+class RemoteEngineWorker {
+    constructor() { this.onmessage = null; this.onerror = null; this.terminated = false; }
+    postMessage(data) {
+        // text/plain keeps this a simple CORS request (no preflight)
+        fetch(ENGINE_SERVICE_URL, { method: 'POST', headers: { 'Content-Type': 'text/plain' }, body: JSON.stringify(data) })
+            .then(r => { if (!r.ok) throw new Error('Engine service error ' + r.status); return r.json(); })
+            .then(d => { if (!this.terminated && this.onmessage) this.onmessage({ data: d }); })
+            .catch(() => {
+                // Service went away: answer this request locally
+                engineServiceUp = false;
+                if (this.terminated) return;
+                const w = createBlobWorker();
+                w.onmessage = (e) => { w.terminate(); if (!this.terminated && this.onmessage) this.onmessage(e); };
+                w.onerror = (err) => { w.terminate(); if (!this.terminated && this.onerror) this.onerror(err); };
+                w.postMessage(data);
+            });
+    }
+    terminate() { this.terminated = true; }
+}
+
+function createEngineWorker() {
+    return engineServiceUp ? new RemoteEngineWorker() : createBlobWorker();
+}
+
 // ===== SOUND ENGINE =====
 class SoundEngine {
     constructor() { this.ctx = null; this.enabled = true; }
@@ -268,10 +308,7 @@ class ChessGame {
     // ===== AI WORKER (Blob-based — works with file://) =====
     createAIWorker() {
         if (this.aiWorker) this.aiWorker.terminate();
-        const blob = new Blob([AI_WORKER_CODE], { type: 'application/javascript' });
-        const url = URL.createObjectURL(blob);
-        this.aiWorker = new Worker(url);
-        URL.revokeObjectURL(url);
+        this.aiWorker = createEngineWorker();
         this.aiWorker.onmessage = (e) => {
             const d = e.data;
             if (d.type === 'move') this.handleAIResponse(d.move);
@@ -736,10 +773,7 @@ class ChessGame {
         this.sound.play('hint');
 
         // Create a temporary worker for hint (always works, even in friend mode)
-        const blob = new Blob([AI_WORKER_CODE], { type: 'application/javascript' });
-        const url = URL.createObjectURL(blob);
-        const hintWorker = new Worker(url);
-        URL.revokeObjectURL(url);
+        const hintWorker = createEngineWorker();
 
         showToast('🔮 Calculating best move...');
 
@@ -923,10 +957,7 @@ class ChessGame {
         if (this.timeLimit <= 0 || this.timeLimit > 900) return;
 
         try {
-            const blob = new Blob([AI_WORKER_CODE], { type: 'application/javascript' });
-            const url = URL.createObjectURL(blob);
-            const bw = new Worker(url);
-            URL.revokeObjectURL(url);
+            const bw = createEngineWorker();
             bw.onmessage = (e) => {
                 if (e.data.type === 'bestMove') {
                     this.handleBrilliantResult(e.data.bestSan, e.data.playedSan, e.data.moverColor);
@@ -971,10 +1002,7 @@ class ChessGame {
     requestEval() {
         // Create a temporary worker for eval
         try {
-            const blob = new Blob([AI_WORKER_CODE], { type: 'application/javascript' });
-            const url = URL.createObjectURL(blob);
-            const evalWorker = new Worker(url);
-            URL.revokeObjectURL(url);
+            const evalWorker = createEngineWorker();
             evalWorker.onmessage = (e) => {
                 if (e.data.type === 'eval') this.handleEvalResponse(e.data.score);
                 evalWorker.terminate();
@@ -0,0 +1,76 @@
+from collections import OrderedDict
+
+import pygame
+
+# Pre-rendered surfaces for the translucent effects drawn every frame (last
+# move squares, move dots, the check glow, particles, full-window overlays)
+# and for text. Each surface is built once per size and color; effects that
+# fade reuse it with only the surface alpha changed, so a steady-state frame
+# allocates no surfaces.
+
+GLOW_FRAMES = 30        # Frames in the check-glow strip (one 1 s pulse)
+GLOW_PERIOD = 1000      # ms
+GLOW_PULSE = 5          # Pixels the glow radius grows and shrinks by
+GLOW_ALPHA = 150
+TEXT_CACHE_SIZE = 512
+
+
+class EffectCache:
+    def __init__(self):
+        self.fills = {}
+        self.dots = {}
+        self.glows = {}
+        self.texts = OrderedDict()
+
+    def fill(self, size, color, alpha=255):
+        """A size surface of one RGB color, drawn at `alpha`. Shared by every caller."""
+        key = (size, color[:3])
+        surface = self.fills.get(key)
+        if surface is None:
+            surface = self.fills[key] = pygame.Surface(size).convert()
+            surface.fill(color[:3])
+        surface.set_alpha(alpha)
+        return surface
+
+    def dot(self, size, color, radius):
+        """A size square with a centered circle of the (RGBA) color."""
+        key = (size, color, radius)
+        surface = self.dots.get(key)
+        if surface is None:
+            surface = self.dots[key] = pygame.Surface((size, size), pygame.SRCALPHA)
+            pygame.draw.circle(surface, color, (size // 2, size // 2), radius)
+        return surface
+
+    def glow(self, size, color, ticks):
+        """Frame of the pulsing glow around a size square at time `ticks` (ms).
+
+        All frames share one size, GLOW_PULSE wider than the square on every
+        side, so they are blitted centered at the same offset.
+        """
+        key = (size, color)
+        strip = self.glows.get(key)
+        if strip is None:
+            strip = self.glows[key] = [self._glow_frame(size, color, i / GLOW_FRAMES) for i in range(GLOW_FRAMES)]
+        return strip[ticks % GLOW_PERIOD * GLOW_FRAMES // GLOW_PERIOD]
+
+    @staticmethod
+    def _glow_frame(size, color, phase):
+        center = size // 2 + GLOW_PULSE
+        surface = pygame.Surface((center * 2, center * 2), pygame.SRCALPHA)
+        radius = size // 2 + GLOW_PULSE * abs(1 - phase * 2)
+        # Concentric circles, fading out towards the edge
+        for r in range(int(radius), 0, -2):
+            pygame.draw.circle(surface, (*color[:3], int(GLOW_ALPHA * (1 - r / radius))), (center, center), r)
+        return surface
+
+    def text(self, font, text, color):
+        """font.render(text, True, color), remembered for the most recently drawn strings."""
+        key = (font, text, color)
+        surface = self.texts.get(key)
+        if surface is None:
+            surface = self.texts[key] = font.render(text, True, color)
+            if len(self.texts) > TEXT_CACHE_SIZE:
+                self.texts.popitem(last=False)
+        else:
+            self.texts.move_to_end(key)
+        return surface
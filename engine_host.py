@@ -0,0 +1,313 @@
+import argparse
+import heapq
+import itertools
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import chess
+
+from chess_ai import ChessBot
+import position_codec
+
+# One scheduler for the searches of many simultaneous games. A fixed number
+# of worker processes bounds total CPU; requests wait in an earliest-deadline-
+# first queue, each session has at most one search running, and every search
+# gets a node/time budget from its difficulty, shrunk to fit its deadline and
+# the current load. When the queue is full or a deadline cannot be met the
+# request is refused up front instead of making everyone late.
+
+# Per-difficulty search budgets ("easy" is a random move and costs nothing)
+BUDGETS = {
+    "easy": {"time": 0.05, "nodes": 1},
+    "medium": {"time": 1.0, "nodes": 20_000},
+    "hard": {"time": 3.0, "nodes": 100_000},
+    "absolute": {"time": 6.0, "nodes": 400_000},
+}
+
+DEFAULT_DEADLINE = 10.0  # Seconds from submission
+MAX_QUEUE = 256
+SAFETY_MARGIN = 0.05     # Seconds kept back for result delivery
+MIN_SEARCH_TIME = 0.05
+METRIC_SAMPLES = 2000
+
+
+class EngineOverloaded(Exception):
+    pass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class SearchResult:
+    def __init__(self, move, stats, wait, latency):
+        self.move = move
+        self.stats = stats
+        self.wait = wait
+        self.latency = latency
+
+    def __repr__(self):
+        return f"SearchResult(move={self.move}, wait={self.wait:.3f}, latency={self.latency:.3f})"
+
+
+class _Request:
+    def __init__(self, session, snapshot, level, deadline):
+        self.session = session
+        # Compact position_codec snapshot instead of a pickled Board and its history
+        self.snapshot = snapshot
+        self.level = level
+        self.deadline = deadline
+        self.submitted = time.monotonic()
+        self.started = None
+        self.future = Future()
+
+
+# --- Worker processes ---
+
+_bots = {}
+
+
+def _run_search(snapshot, level, time_limit, node_limit):
+    bot = _bots.get(level)
+    if bot is None:
+        bot = _bots[level] = ChessBot(level)
+    bot.time_limit = time_limit
+    bot.node_limit = node_limit
+    # The snapshot has no move stack; its hashes stand in for it in repetition checks
+    board, bot.history = position_codec.decode(snapshot)
+    move = bot.get_move(board)
+    return (move.uci() if move else None), bot.last_stats
+
+
+def _percentiles(samples):
+    if not samples:
+        return {"p50": 0.0, "p90": 0.0, "p99": 0.0}
+    ordered = sorted(samples)
+    last = len(ordered) - 1
+    return {f"p{p}": round(ordered[round(p / 100 * last)], 4) for p in (50, 90, 99)}
+
+
+class EngineHost:
+    def __init__(self, workers=None, budgets=None, max_queue=MAX_QUEUE):
+        self.workers = workers or os.cpu_count() or 1
+        self.budgets = budgets or BUDGETS
+        self.max_queue = max_queue
+        self.pool = ProcessPoolExecutor(self.workers)
+        self.cond = threading.Condition()
+        self.queue = []   # Heap of (deadline, seq, request)
+        self.running = {} # session -> request
+        self.seq = itertools.count()
+        self.closed = False
+
+        self.counters = {"submitted": 0, "completed": 0, "rejected": 0, "expired": 0, "failed": 0, "cancelled": 0}
+        self.waits = deque(maxlen=METRIC_SAMPLES)
+        self.latencies = deque(maxlen=METRIC_SAMPLES)
+        self.service_times = deque(maxlen=100)
+
+        self.thread = threading.Thread(target=self._schedule_loop, daemon=True)
+        self.thread.start()
+
+    def submit(self, session, board, level, deadline=None):
+        """Queues a search; returns a Future resolving to a SearchResult.
+
+        deadline is seconds from now. Raises EngineOverloaded if the request
+        cannot be accepted.
+        """
+        now = time.monotonic()
+        request = _Request(session, position_codec.encode(board), level, now + (deadline or DEFAULT_DEADLINE))
+        with self.cond:
+            if self.closed:
+                raise RuntimeError("engine host is shut down")
+            if len(self.queue) >= self.max_queue or now + self._estimated_wait() > request.deadline:
+                self.counters["rejected"] += 1
+                raise EngineOverloaded(f"{len(self.queue)} queued, {len(self.running)} running")
+            self.counters["submitted"] += 1
+            heapq.heappush(self.queue, (request.deadline, next(self.seq), request))
+            self.cond.notify()
+        return request.future
+
+    def _estimated_wait(self):
+        if not self.service_times:
+            return 0.0
+        avg = sum(self.service_times) / len(self.service_times)
+        return (len(self.queue) + len(self.running)) / self.workers * avg
+
+    def _next_request(self, now):
+        # Earliest deadline first, skipping sessions that already have a search running
+        deferred = []
+        chosen = None
+        while self.queue:
+            item = heapq.heappop(self.queue)
+            request = item[2]
+            if request.future.cancelled():
+                # The caller gave up on it while it was queued
+                self.counters["cancelled"] += 1
+                continue
+            if request.deadline - SAFETY_MARGIN <= now:
+                if request.future.set_running_or_notify_cancel():
+                    self.counters["expired"] += 1
+                    request.future.set_exception(DeadlineExceeded("deadline passed while queued"))
+                else:
+                    self.counters["cancelled"] += 1
+                continue
+            if request.session in self.running:
+                deferred.append(item)
+                continue
+            # From here on the caller can no longer cancel it
+            if not request.future.set_running_or_notify_cancel():
+                self.counters["cancelled"] += 1
+                continue
+            chosen = request
+            break
+        for item in deferred:
+            heapq.heappush(self.queue, item)
+        return chosen
+
+    def _schedule_loop(self):
+        while True:
+            with self.cond:
+                while True:
+                    if self.closed:
+                        return
+                    request = None
+                    if len(self.running) < self.workers:
+                        request = self._next_request(time.monotonic())
+                    if request:
+                        break
+                    self.cond.wait(timeout=0.1)
+
+                now = time.monotonic()
+                request.started = now
+                self.running[request.session] = request
+                budget = self.budgets.get(request.level, self.budgets["hard"])
+                # Under load every search gets a proportionally smaller slice
+                load = max(1.0, (len(self.queue) + len(self.running)) / self.workers)
+                time_limit = min(budget["time"] / load, request.deadline - now - SAFETY_MARGIN)
+                time_limit = max(time_limit, MIN_SEARCH_TIME)
+
+            pool = self.pool
+            try:
+                future = pool.submit(_run_search, request.snapshot, request.level, time_limit, budget["nodes"])
+            except Exception as e:
+                # Fail this request but keep scheduling the others
+                if isinstance(e, BrokenProcessPool):
+                    self._replace_pool(pool)
+                self._failed(request, e)
+                continue
+            future.add_done_callback(lambda f, r=request, p=pool: self._finished(r, f, p))
+
+    def _replace_pool(self, broken):
+        # A worker died and the executor refuses all further work; searches
+        # still running on it fail on their own
+        with self.cond:
+            if self.pool is not broken or self.closed:
+                return
+            self.pool = ProcessPoolExecutor(self.workers)
+        broken.shutdown(wait=False, cancel_futures=True)
+
+    def _failed(self, request, error):
+        with self.cond:
+            self.running.pop(request.session, None)
+            self.counters["failed"] += 1
+            self.cond.notify()
+        if not request.future.done():
+            request.future.set_exception(error)
+
+    def _finished(self, request, future, pool):
+        now = time.monotonic()
+        error = None if future.cancelled() else future.exception()
+        if future.cancelled():
+            # Only a pool shutdown cancels a search; the request is already
+            # running, so it can't be cancelled and has to fail instead
+            with self.cond:
+                self.running.pop(request.session, None)
+                self.cond.notify()
+            if not request.future.done():
+                request.future.set_exception(CancelledError())
+            return
+        if error is not None:
+            if isinstance(error, BrokenProcessPool):
+                self._replace_pool(pool)
+            self._failed(request, error)
+            return
+
+        move, stats = future.result()
+        with self.cond:
+            self.running.pop(request.session, None)
+            self.cond.notify()
+            wait = request.started - request.submitted
+            latency = now - request.submitted
+            self.counters["completed"] += 1
+            self.waits.append(wait)
+            self.latencies.append(latency)
+            self.service_times.append(now - request.started)
+        if not request.future.done():
+            request.future.set_result(SearchResult(chess.Move.from_uci(move) if move else None, stats, wait, latency))
+
+    def metrics(self):
+        with self.cond:
+            return dict(self.counters,
+                        workers=self.workers,
+                        queue_depth=len(self.queue),
+                        running=len(self.running),
+                        wait=_percentiles(self.waits),
+                        latency=_percentiles(self.latencies))
+
+    def shutdown(self):
+        with self.cond:
+            self.closed = True
+            for _, _, request in self.queue:
+                request.future.cancel()
+            self.queue.clear()
+            self.cond.notify_all()
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+def simulate(sessions=16, moves=5, workers=None, deadline=DEFAULT_DEADLINE, seed=0):
+    """Plays `sessions` concurrent AI games for a few moves each and prints host metrics."""
+    rng = random.Random(seed)
+    host = EngineHost(workers)
+    levels = list(BUDGETS)
+
+    def play(session):
+        board = chess.Board()
+        level = rng.choice(levels)
+        for _ in range(moves):
+            try:
+                result = host.submit(session, board, level, deadline).result()
+            except (EngineOverloaded, DeadlineExceeded):
+                time.sleep(0.2)
+                continue
+            if result.move is None:
+                break
+            board.push(result.move)
+            # The opponent "thinks" for a moment
+            if board.is_game_over():
+                break
+            board.push(rng.choice(list(board.legal_moves)))
+
+    threads = [threading.Thread(target=play, args=(i,)) for i in range(sessions)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    metrics = host.metrics()
+    host.shutdown()
+    for key, value in metrics.items():
+        print(f"{key}: {value}")
+    return metrics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load-test the engine host with simulated games.")
+    parser.add_argument("--sessions", type=int, default=16)
+    parser.add_argument("--moves", type=int, default=5)
+    parser.add_argument("-j", "--workers", type=int, default=None)
+    parser.add_argument("--deadline", type=float, default=DEFAULT_DEADLINE)
+    args = parser.parse_args()
+    simulate(args.sessions, args.moves, args.workers, args.deadline)
@@ -0,0 +1,403 @@
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import logging
+import os
+import struct
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import chess
+
+from chess_ai import ChessBot, SEARCH_DEPTHS
+from mate_search import MateSearch
+from position_cache import PositionCache
+
+# Local engine service for the chess_new web frontend. It speaks the same
+# messages as the Blob worker in app.js (getMove, getHint, eval, bestMove),
+# over plain HTTP POST or a WebSocket, and answers them from a warm process
+# pool. Identical positions share one search: finished results are kept in
+# an LRU, and requests for a position already being searched wait on the
+# search in flight instead of starting another. getHint, bestMove and the
+# extra "analyse" message all read the same MultiPV analysis of a position.
+
+HOST = "127.0.0.1"
+PORT = 8765
+RESULT_CACHE_SIZE = 4096
+MULTIPV = 3  # Lines per analysis; serves hint, eval and move classification at once
+MAX_BODY = 64 * 1024
+WS_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC11B85"
+
+log = logging.getLogger("engine_server")
+
+# Browser origins allowed to use the service (none unless given with
+# --origin). Requests from any other page are refused, since a simple POST
+# or a WebSocket reaches the server whatever CORS says. "null" is never
+# allowed: sandboxed iframes and data: documents on any site send it too.
+ORIGINS = ()
+CORS_HEADERS = (
+    "Access-Control-Allow-Origin: {origin}\r\n"
+    "Vary: Origin\r\n"
+    "Access-Control-Allow-Methods: GET, POST, OPTIONS\r\n"
+    "Access-Control-Allow-Headers: Content-Type\r\n"
+)
+
+# --- Worker processes ---
+
+_bots = {}
+_cache = None
+
+
+def _init_worker(cache_path):
+    global _cache
+    _cache = PositionCache(cache_path) if cache_path else None
+    for level in SEARCH_DEPTHS:
+        _bots[level] = ChessBot(level, _cache)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _search(fen, level):
+    bot = _bots[level]
+    move = bot.get_move(chess.Board(fen))
+    return move.uci() if move else None
+
+
+def _mate(fen):
+    line = MateSearch().search(chess.Board(fen))
+    return [move.uci() for move in line] if line else None
+
+
+def _analyse(fen, level, multipv):
+    lines = _bots[level].analyse(chess.Board(fen), multipv)
+    return [(move.uci(), score) for move, score in lines]
+
+
+# --- Service ---
+
+class EngineService:
+    def __init__(self, processes=None, cache_path="position_cache.db", cache_size=RESULT_CACHE_SIZE):
+        self.processes = processes or os.cpu_count() or 1
+        self.pool = ProcessPoolExecutor(self.processes, initializer=_init_worker, initargs=(cache_path,))
+        self.cache_size = cache_size
+        self.results = OrderedDict()
+        self.inflight = {}
+        self.eval_bot = ChessBot()
+        self.random_bot = ChessBot("easy")
+        self.stats = {"requests": 0, "cache_hits": 0, "coalesced": 0, "searches": 0, "search_time": 0.0}
+
+    async def warm_up(self):
+        # Start every worker now so the first request doesn't pay for process startup
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _ping) for _ in range(self.processes)))
+
+    def shutdown(self):
+        self.pool.shutdown(cancel_futures=True)
+
+    def _remember(self, key, value):
+        self.results[key] = value
+        self.results.move_to_end(key)
+        while len(self.results) > self.cache_size:
+            self.results.popitem(last=False)
+
+    def _cached(self, key):
+        if key in self.results:
+            self.stats["cache_hits"] += 1
+            self.results.move_to_end(key)
+            return True
+        return False
+
+    async def _shared(self, key, fn, *args):
+        """Runs fn(*args) in the pool once per key, however many requests ask for it."""
+        if self._cached(key):
+            return self.results[key]
+        if key in self.inflight:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(self.inflight[key])
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.pool, fn, *args)
+        self.inflight[key] = future
+        start = time.perf_counter()
+
+        def finished(f):
+            # Runs even if every waiting client has gone away
+            del self.inflight[key]
+            if not f.cancelled() and f.exception() is None:
+                self.stats["searches"] += 1
+                self.stats["search_time"] += time.perf_counter() - start
+                self._remember(key, f.result())
+
+        future.add_done_callback(finished)
+        return await asyncio.shield(future)
+
+    async def best_move(self, board, level):
+        """Best move (UCI) for the position; one search per (position, level) at a time."""
+        if level not in SEARCH_DEPTHS:
+            move = self.random_bot.get_move(board)
+            return move.uci() if move else None
+        analysis_key = ("analyse", board.epd(), level)
+        if self._cached(analysis_key):
+            lines = self.results[analysis_key]
+            return lines[0][0] if lines else None
+        return await self._shared(("search", board.epd(), level), _search, board.fen(), level)
+
+    async def analysis(self, board, level):
+        """[(uci, score), ...] for the MULTIPV best moves, best first."""
+        if level not in SEARCH_DEPTHS:
+            level = "hard"
+        return await self._shared(("analyse", board.epd(), level), _analyse, board.fen(), level, MULTIPV)
+
+    async def mate(self, board):
+        """Forced mate line (UCI moves) for the side to move, or None."""
+        return await self._shared(("mate", board.epd()), _mate, board.fen())
+
+    def evaluate(self, board):
+        key = ("eval", board.epd())
+        if key in self.results:
+            self.stats["cache_hits"] += 1
+            self.results.move_to_end(key)
+            return self.results[key]
+        score = self.eval_bot.evaluate_board(board)
+        self._remember(key, score)
+        return score
+
+    async def handle(self, msg):
+        self.stats["requests"] += 1
+        if not isinstance(msg, dict):
+            raise ValueError("message must be a JSON object")
+        kind = msg.get("type")
+        board = chess.Board(msg["fen"])
+        level = msg.get("difficulty") or "hard"
+
+        if kind == "eval":
+            reply = {"type": "eval", "score": self.evaluate(board)}
+        elif kind == "getMove":
+            uci = await self.best_move(board, level)
+            reply = {"type": "move", "move": board.san(chess.Move.from_uci(uci)) if uci else None}
+        elif kind == "getHint":
+            # A forced mate is the hint if there is one; it is found far faster than the analysis
+            mate = await self.mate(board)
+            lines = [(mate[0], None)] if mate else await self.analysis(board, level)
+            if lines:
+                move = chess.Move.from_uci(lines[0][0])
+                reply = {"type": "hint", "from": chess.square_name(move.from_square),
+                         "to": chess.square_name(move.to_square), "san": board.san(move)}
+                if mate:
+                    reply["mateIn"] = (len(mate) + 1) // 2
+            else:
+                reply = {"type": "hint", "from": None, "to": None}
+        elif kind == "bestMove":
+            lines = await self.analysis(board, level)
+            sans = [board.san(chess.Move.from_uci(uci)) for uci, _ in lines]
+            played = msg.get("playedSan")
+            reply = {"type": "bestMove", "bestSan": sans[0] if sans else None,
+                     "playedSan": played, "moverColor": msg.get("moverColor"),
+                     "playedRank": None, "scoreLoss": None}
+            if played in sans:
+                # Rank 1 is the best move; the loss is from the mover's point of view
+                rank = sans.index(played)
+                sign = 1 if board.turn == chess.WHITE else -1
+                reply["playedRank"] = rank + 1
+                reply["scoreLoss"] = sign * (lines[0][1] - lines[rank][1])
+        elif kind == "analyse":
+            lines = await self.analysis(board, level)
+            reply = {"type": "analysis", "score": lines[0][1] if lines else self.evaluate(board),
+                     "lines": [{"uci": uci, "san": board.san(chess.Move.from_uci(uci)), "score": score}
+                               for uci, score in lines]}
+        else:
+            raise ValueError(f"unknown message type {kind!r}")
+
+        if "id" in msg:
+            reply["id"] = msg["id"]
+        return reply
+
+    def status(self):
+        searches = self.stats["searches"]
+        return dict(self.stats, workers=self.processes, cached=len(self.results), inflight=len(self.inflight),
+                    avg_search_ms=round(1000 * self.stats["search_time"] / searches, 1) if searches else 0)
+
+
+# --- HTTP / WebSocket transport ---
+
+async def _read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    method, path, _ = line.decode("latin-1").split(" ", 2)
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY:
+        raise ValueError("request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method, path, headers, body
+
+
+def _response(status, body=b"", content_type="application/json", origin=None):
+    cors = CORS_HEADERS.format(origin=origin) if origin else ""
+    return (f"HTTP/1.1 {status}\r\n{cors}"
+            f"Content-Type: {content_type}\r\nContent-Length: {len(body)}\r\n\r\n").encode() + body
+
+
+async def _ws_read(reader):
+    head = await reader.readexactly(2)
+    opcode = head[0] & 0x0F
+    length = head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", await reader.readexactly(8))[0]
+    if length > MAX_BODY:
+        raise ValueError("frame too large")
+    mask = await reader.readexactly(4) if head[1] & 0x80 else None
+    payload = await reader.readexactly(length)
+    if mask:
+        payload = bytes(b ^ mask[i % 4] for i, b in enumerate(payload))
+    return opcode, payload
+
+
+def _ws_frame(opcode, payload):
+    length = len(payload)
+    if length < 126:
+        header = struct.pack("!BB", 0x80 | opcode, length)
+    elif length < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, length)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, length)
+    return header + payload
+
+
+class EngineServer:
+    def __init__(self, service, host=HOST, port=PORT, origins=ORIGINS):
+        self.service = service
+        self.host = host
+        self.port = port
+        if "null" in origins:
+            raise ValueError('the "null" origin can be sent by any website')
+        self.origins = set(origins)
+
+    async def serve_forever(self):
+        await self.service.warm_up()
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port)
+        print(f"Engine service on http://{self.host}:{self.port} ({self.service.processes} workers)")
+        async with server:
+            await server.serve_forever()
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, path, headers, body = request
+                # Clients without an Origin header aren't browsers (curl, scripts)
+                origin = headers.get("origin")
+                if origin is not None and origin not in self.origins:
+                    writer.write(_response("403 Forbidden", b'{"error": "origin not allowed"}'))
+                    await writer.drain()
+                    break
+                if headers.get("upgrade", "").lower() == "websocket":
+                    await self.handle_websocket(reader, writer, headers)
+                    break
+                writer.write(await self.handle_http(method, path, body, origin))
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_http(self, method, path, body, origin=None):
+        if method == "OPTIONS":
+            return _response("204 No Content", origin=origin)
+        if method == "GET" and path in ("/health", "/stats"):
+            return _response("200 OK", json.dumps(self.service.status()).encode(), origin=origin)
+        if method != "POST":
+            return _response("404 Not Found", b'{"error": "not found"}', origin=origin)
+        try:
+            reply = await self.service.handle(json.loads(body))
+        except (ValueError, KeyError) as e:
+            return _response("400 Bad Request", json.dumps({"error": str(e)}).encode(), origin=origin)
+        except Exception:
+            # e.g. a worker process died; the connection stays usable
+            log.exception("request %r failed", body[:200])
+            return _response("500 Internal Server Error", b'{"error": "internal error"}', origin=origin)
+        return _response("200 OK", json.dumps(reply).encode(), origin=origin)
+
+    async def handle_websocket(self, reader, writer, headers):
+        if "sec-websocket-key" not in headers:
+            writer.write(_response("400 Bad Request", b'{"error": "missing Sec-WebSocket-Key"}'))
+            await writer.drain()
+            return
+        accept = base64.b64encode(hashlib.sha1((headers["sec-websocket-key"] + WS_GUID).encode()).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                     b"Sec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        await writer.drain()
+
+        async def answer(payload):
+            msg, msg_id = None, None
+            try:
+                # A bad message gets an error reply; the socket and other pending ids stay up
+                msg = json.loads(payload)
+                msg_id = msg.get("id") if isinstance(msg, dict) else None
+                reply = await self.service.handle(msg)
+            except (ValueError, KeyError) as e:
+                reply = {"error": str(e), "id": msg_id}
+            except Exception:
+                # Without a reply the client would wait for this id forever
+                log.exception("message %r failed", msg)
+                reply = {"error": "internal error", "id": msg_id}
+            writer.write(_ws_frame(0x1, json.dumps(reply).encode()))
+
+        tasks = set()
+        while True:
+            opcode, payload = await _ws_read(reader)
+            if opcode == 0x8:
+                writer.write(_ws_frame(0x8, payload[:2]))
+                break
+            if opcode == 0x9:
+                writer.write(_ws_frame(0xA, payload))
+            elif opcode == 0x1:
+                # Each message is answered as soon as its search finishes, so tag them with "id"
+                task = asyncio.create_task(answer(payload))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        await writer.drain()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve ChessBot to the web frontend on localhost.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("-j", "--processes", type=int, default=None)
+    parser.add_argument("--cache", default="position_cache.db", help="shared position cache ('' to disable)")
+    parser.add_argument("--origin", action="append", dest="origins",
+                        help="browser origin allowed to use the service, e.g. http://localhost:8000 (repeatable)")
+    args = parser.parse_args(argv)
+    if args.origins and "null" in args.origins:
+        parser.error('--origin null would let any website use the engine')
+    logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    service = EngineService(args.processes, args.cache or None)
+    try:
+        asyncio.run(EngineServer(service, args.host, args.port, args.origins or ORIGINS).serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+import chess
+import chess.pgn
+
+# Every record is one JSON line. A crash can at most leave a torn last line,
+# which read_games() skips, so all moves up to the last fsync survive.
+FSYNC_INTERVAL = 2.0        # Seconds between forced flushes to disk
+BUFFER_SIZE = 64 * 1024     # Userspace write buffer
+
+
+class GameRecorder:
+    """Appends every move of a game to a JSON-lines log from a background thread.
+
+    The public methods only build a small dict and put it on a queue, so they
+    never touch the disk from the caller's (frame loop) thread.
+    """
+
+    def __init__(self, path, fsync_interval=FSYNC_INTERVAL, buffer_size=BUFFER_SIZE):
+        self.path = path
+        self.fsync_interval = fsync_interval
+        self.buffer_size = buffer_size
+        self.game_id = None
+        self.ply = 0
+        self.queue = queue.Queue()
+        self.closed = False
+
+        self.thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    # --- Producer side (called from the game loop) ---
+
+    def start_game(self, **headers):
+        if self.game_id is not None:
+            self.end_game("*", "Abandoned")
+        self.game_id = f"{int(time.time() * 1000):x}-{os.getpid()}"
+        self.ply = 0
+        self._put({"event": "start", "headers": headers})
+
+    def record_move(self, board, move, white_time=None, black_time=None, stats=None):
+        # `board` is the position *before* `move` is pushed
+        if self.game_id is None:
+            return
+        self.ply += 1
+        record = {
+            "event": "move",
+            "ply": self.ply,
+            "uci": move.uci(),
+            "san": board.san(move),
+            "white_time": round(white_time, 2) if white_time is not None else None,
+            "black_time": round(black_time, 2) if black_time is not None else None
+        }
+        if stats:
+            record["stats"] = stats
+        self._put(record)
+
+    def record_undo(self, plies=1):
+        if self.game_id is None:
+            return
+        self.ply = max(0, self.ply - plies)
+        self._put({"event": "undo", "plies": plies})
+
+    def end_game(self, result, reason=None):
+        if self.game_id is None:
+            return
+        self._put({"event": "end", "result": result, "reason": reason}, sync=True)
+        self.game_id = None
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.game_id is not None:
+            self.end_game("*", "Abandoned")
+        self.queue.put(None)
+        self.thread.join(timeout=5)
+
+    def _put(self, record, sync=False):
+        record["game"] = self.game_id
+        record["time"] = round(time.time(), 3)
+        self.queue.put((record, sync))
+
+    # --- Writer thread ---
+
+    def _writer_loop(self):
+        last_sync = time.monotonic()
+        dirty = False
+        with open(self.path, "a", buffering=self.buffer_size, encoding="utf-8") as f:
+            while True:
+                try:
+                    item = self.queue.get(timeout=self.fsync_interval)
+                except queue.Empty:
+                    item = ()
+
+                if item is None:
+                    break
+                sync = False
+                if item:
+                    record, sync = item
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                    dirty = True
+
+                if dirty and (sync or time.monotonic() - last_sync >= self.fsync_interval):
+                    self._sync(f)
+                    dirty = False
+                    last_sync = time.monotonic()
+
+            if dirty:
+                self._sync(f)
+
+    def _sync(self, f):
+        f.flush()
+        try:
+            os.fsync(f.fileno())
+        except OSError:
+            pass
+
+
+def read_games(path):
+    """Yields a chess.pgn.Game for every game in a recorder log, including unfinished ones."""
+    games = {}
+    order = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue # Torn write from a crash
+
+            game_id = record.get("game")
+            event = record.get("event")
+            if event == "start":
+                games[game_id] = {"headers": record.get("headers", {}), "time": record["time"], "moves": [], "end": None}
+                order.append(game_id)
+            elif game_id not in games:
+                continue
+            elif event == "move":
+                games[game_id]["moves"].append(record)
+            elif event == "undo":
+                del games[game_id]["moves"][-record["plies"]:]
+            elif event == "end":
+                games[game_id]["end"] = record
+
+    for game_id in order:
+        yield _build_game(game_id, games[game_id])
+
+
+def _build_game(game_id, data):
+    game = chess.pgn.Game()
+    game.headers["Event"] = "Chess Bot"
+    game.headers["Date"] = time.strftime("%Y.%m.%d", time.localtime(data["time"]))
+    for key, value in data["headers"].items():
+        game.headers[key] = str(value)
+    game.headers["GameId"] = game_id
+
+    node = game
+    board = game.board()
+    for record in data["moves"]:
+        move = chess.Move.from_uci(record["uci"])
+        if not board.is_legal(move):
+            break
+        board.push(move)
+        node = node.add_variation(move)
+        comments = []
+        clock = record["white_time"] if record["ply"] % 2 == 1 else record["black_time"]
+        if clock is not None:
+            h, rem = divmod(int(clock), 3600)
+            comments.append(f"[%clk {h}:{rem // 60:02}:{rem % 60:02}]")
+        stats = record.get("stats")
+        if stats:
+            comments.append(f"d={stats.get('depth')} nodes={stats.get('nodes')} t={stats.get('time')}s")
+        node.comment = " ".join(comments)
+
+    end = data["end"]
+    game.headers["Result"] = end["result"] if end else "*"
+    if end and end.get("reason"):
+        game.headers["Termination"] = end["reason"]
+    return game
+
+
+if __name__ == "__main__":
+    # Usage: python game_recorder.py game_log.jsonl > games.pgn
+    if len(sys.argv) != 2:
+        print("usage: python game_recorder.py <log.jsonl>", file=sys.stderr)
+        sys.exit(1)
+    exporter = chess.pgn.FileExporter(sys.stdout)
+    for game in read_games(sys.argv[1]):
+        game.accept(exporter)
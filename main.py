@@ -3,8 +3,13 @@ import sys
 import chess
 import random
 from chess_ai import ChessBot
+from game_recorder import GameRecorder
+from position_cache import PositionCache
 import threading
 import queue
+import time
+from perf_hud import PerfHUD
+from effect_cache import EffectCache
 
 # --- Constants ---
 WIDTH, HEIGHT = 500, 600  # More compact window
@@ -12,6 +17,12 @@ BOARD_SIZE = 400          # Slightly smaller board to fit screen
 SQUARE_SIZE = BOARD_SIZE // 8
 OFFSET_X = (WIDTH - BOARD_SIZE) // 2
 OFFSET_Y = 80             # Adjusted for better vertical spacing
+GAME_LOG_PATH = "game_log.jsonl"
+POSITION_CACHE_PATH = "position_cache.db"
+PERF_TRACE_PATH = "perf_trace.json"
+CACHE_WRITE_TIMEOUT = 0.25  # Hints write on the UI thread; a busy cache skips the write instead
+IDLE_FPS = 60
+SEARCH_FPS = 20  # While the AI searches; also the bound on input latency (50 ms)
 
 # Colors
 COLOR_HIGHLIGHT = (255, 230, 100, 100)
@@ -21,6 +32,7 @@ COLOR_TEXT_BLACK = (20, 20, 20)
 COLOR_BUTTON = (70, 130, 180)
 COLOR_BUTTON_HOVER = (100, 160, 210)
 COLOR_ATTACK = (200, 50, 50, 180) # Red for captures
+COLOR_CHECK_GLOW = (255, 0, 0)
 
 UNICODE_PIECES = {
     'r': '♜', 'n': '♞', 'b': '♝', 'q': '♛', 'k': '♚', 'p': '♟',
@@ -28,7 +40,7 @@ UNICODE_PIECES = {
 }
 
 class ChessGame:
-    def __init__(self):
+    def __init__(self, game_log_path=GAME_LOG_PATH, position_cache_path=POSITION_CACHE_PATH):
         pygame.init()
         pygame.mixer.init()
         
@@ -38,9 +50,13 @@ class ChessGame:
         self.font_large = pygame.font.SysFont("segoe ui symbol", 40)
         self.font_small = pygame.font.SysFont("segoe ui", 20)
         self.font_menu = pygame.font.SysFont("segoe ui", 28)
+        self.font_button = pygame.font.SysFont("segoe ui", 16)
+        self.font_coords = pygame.font.SysFont("segoe ui", 14, bold=True)
+        self.effects = EffectCache()
         
         self.board = chess.Board()
         self.ai = None
+        self.hint_bot = None
         self.player_color = chess.WHITE
         self.selected_square = None
         self.dragging = False
@@ -75,6 +91,22 @@ class ChessGame:
         self.game_over_timer = None # For auto-menu redirect
         self.ai_thread = None
         self.ai_queue = queue.Queue()
+        self.ai_move_stats = None
+        self.ai_search_start = None
+        self.in_menu = True
+
+        # --- Frame pacing (see pace_frame) ---
+        self.throttle_while_searching = True
+        self.reduced_effects = False
+        self.drawn_frame = None
+
+        # --- Performance HUD (F3 overlay, F4 trace recording) ---
+        self.hud = PerfHUD(PERF_TRACE_PATH)
+
+        # --- Game Log (written on a background thread) ---
+        self.recorder = GameRecorder(game_log_path)
+        # --- Search Cache (shared with other sessions on this machine) ---
+        self.position_cache = PositionCache(position_cache_path, timeout=CACHE_WRITE_TIMEOUT)
         
         # --- Option 5: Polish State ---
         self.shake_amount = 0
@@ -161,6 +193,7 @@ class ChessGame:
 
     def play_sound(self, name):
         if self.sound_enabled and name in self.sounds:
+            if self.hud.tracing: self.hud.instant(f"sound {name}")
             self.sounds[name].play()
 
     def reset_game(self):
@@ -186,6 +219,7 @@ class ChessGame:
         self.menu_transition_time = None
         self.game_over_timer = None
         self.ai_thread = None
+        self.ai_search_start = None
         while not self.ai_queue.empty(): self.ai_queue.get()
         
         if self.time_limit:
@@ -197,12 +231,44 @@ class ChessGame:
             self.black_time = None
 
         if self.difficulty != "friend":
-            self.ai = ChessBot(self.difficulty)
+            self.ai = ChessBot(self.difficulty, self.position_cache)
         else:
             self.ai = None
+        # Hints search on the main thread, possibly while the AI thread is
+        # searching, so they get their own bot and its own search state
+        self.hint_bot = ChessBot(self.difficulty if self.ai else "hard", self.position_cache)
+
+        if self.ai:
+            bot_name = f"Chess Bot ({self.difficulty})"
+            white, black = ("Player", bot_name) if self.player_color == chess.WHITE else (bot_name, "Player")
+        else:
+            white, black = "White", "Black"
+        self.ai_move_stats = None
+        self.recorder.start_game(White=white, Black=black, TimeControl=self.time_limit or "-")
+
+    def record_move(self, move):
+        # Must be called before the move is pushed
+        stats = None
+        if self.ai and self.board.turn != self.player_color:
+            stats = self.ai_move_stats
+            self.ai_move_stats = None
+        self.recorder.record_move(self.board, move, self.white_time, self.black_time, stats)
+
+    def record_result(self):
+        outcome = self.board.outcome()
+        if self.winner == "Resigned":
+            loser = self.board.turn if self.difficulty == "friend" else self.player_color
+            self.recorder.end_game("0-1" if loser == chess.WHITE else "1-0", "Resignation")
+        elif self.winner == "Timeout":
+            loser = chess.WHITE if self.white_time <= 0 else chess.BLACK
+            self.recorder.end_game("0-1" if loser == chess.WHITE else "1-0", "Time forfeit")
+        elif outcome:
+            self.recorder.end_game(outcome.result(), outcome.termination.name.replace("_", " ").title())
+        else:
+            self.recorder.end_game("*")
 
     def draw_text_centered(self, text, font, color, center_x, center_y):
-        surface = font.render(text, True, color)
+        surface = self.effects.text(font, text, color)
         rect = surface.get_rect(center=(center_x, center_y))
         self.screen.blit(surface, rect)
 
@@ -343,7 +409,7 @@ class ChessGame:
     def draw_board(self):
         theme = self.current_theme
         # Coordinates font
-        font_coords = pygame.font.SysFont("segoe ui", 14, bold=True)
+        font_coords = self.font_coords
         
         for r in range(8):
             for c in range(8):
@@ -359,12 +425,10 @@ class ChessGame:
                         logical_c = 7 - c; logical_r = 7 - r
                     sq_idx = chess.square(logical_c, logical_r)
                     if sq_idx == last_move.from_square or sq_idx == last_move.to_square:
-                         s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
                          # --- Breathing Effect for Last Move ---
-                         pulse = (pygame.time.get_ticks() % 1000) / 1000.0
+                         pulse = 0 if self.reduced_effects else (pygame.time.get_ticks() % 1000) / 1000.0
                          alpha = 60 + 40 * abs(0.5 - pulse) * 2 # Glow intensity shifts
-                         s.fill((*COLOR_HIGHLIGHT[:3], int(alpha)))
-                         self.screen.blit(s, rect.topleft)
+                         self.screen.blit(self.effects.fill((SQUARE_SIZE, SQUARE_SIZE), COLOR_HIGHLIGHT, int(alpha)), rect.topleft)
 
         # Draw Labels (A-H, 1-8) - Stay standard
         files = ['A','B','C','D','E','F','G','H']
@@ -379,6 +443,7 @@ class ChessGame:
     def trigger_next_undo(self):
         if self.undo_stack_count > 0 and len(self.board.move_stack) > 0:
             move = self.board.pop()
+            self.recorder.record_undo()
             piece = self.board.piece_at(move.from_square)
             symbol = UNICODE_PIECES[piece.symbol()] if piece else "?"
             rev_move = chess.Move(move.to_square, move.from_square)
@@ -432,9 +497,8 @@ class ChessGame:
                 # Turn dot red if it's a capture move
                 dot_color = COLOR_ATTACK if self.board.is_capture(move) else COLOR_MOVES
                 
-                s = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
-                pygame.draw.circle(s, dot_color, (SQUARE_SIZE//2, SQUARE_SIZE//2), SQUARE_SIZE // 6)
-                self.screen.blit(s, (cx - SQUARE_SIZE//2, cy - SQUARE_SIZE//2))
+                dot = self.effects.dot(SQUARE_SIZE, dot_color, SQUARE_SIZE // 6)
+                self.screen.blit(dot, (cx - SQUARE_SIZE//2, cy - SQUARE_SIZE//2))
         if self.hint_move:
             for sq in [self.hint_move.from_square, self.hint_move.to_square]:
                 x, y = self.get_square_center(sq)
@@ -453,10 +517,6 @@ class ChessGame:
         # Draw game with shake offset if active
         self.screen.fill(theme["bg"])
         
-        # Temp surface for board + pieces to apply shake
-        game_surf = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        # Instead of a full surface (expensive), we'll just offset the coordinates
-        
         # Draw Board & UI
         self.draw_board()
         self.draw_highlights()
@@ -464,23 +524,16 @@ class ChessGame:
         
         # Render Particles
         for p in self.particles:
-            s = pygame.Surface((4,4))
-            s.fill(p["color"])
-            s.set_alpha(p["life"])
-            self.screen.blit(s, p["pos"])
+            self.screen.blit(self.effects.fill((4, 4), p["color"], p["life"]), p["pos"])
 
         if self.board.is_check():
             ks = self.board.king(self.board.turn)
             if ks is not None:
                 x, y = self.get_square_center(ks)
                 # --- Pulse Glow Effect for King ---
-                pulse = (pygame.time.get_ticks() % 1000) / 500.0
-                radius = SQUARE_SIZE // 2 + 5 * abs(1 - pulse)
-                glow_surf = pygame.Surface((radius*2, radius*2), pygame.SRCALPHA)
-                for r_glow in range(int(radius), 0, -2):
-                    alpha = int(150 * (1 - r_glow/radius))
-                    pygame.draw.circle(glow_surf, (255, 0, 0, alpha), (radius, radius), r_glow)
-                self.screen.blit(glow_surf, (x - radius, y - radius))
+                ticks = 0 if self.reduced_effects else pygame.time.get_ticks()
+                glow_surf = self.effects.glow(SQUARE_SIZE, COLOR_CHECK_GLOW, ticks)
+                self.screen.blit(glow_surf, glow_surf.get_rect(center=(x, y)))
                 self.draw_text_centered("CHECK!", self.font_menu, (255, 50, 50), WIDTH // 2, OFFSET_Y // 2)
 
         # Timers (Always show)
@@ -498,7 +551,7 @@ class ChessGame:
             rect = pygame.Rect(WIDTH // 2 - 50, HEIGHT - 55, 100, 40)
             color = COLOR_BUTTON_HOVER if rect.collidepoint(mouse_pos) else COLOR_BUTTON
             pygame.draw.rect(self.screen, color, rect, border_radius=10)
-            self.draw_text_centered("Resign", pygame.font.SysFont("segoe ui", 16), COLOR_TEXT_WHITE, WIDTH // 2, HEIGHT - 35)
+            self.draw_text_centered("Resign", self.font_button, COLOR_TEXT_WHITE, WIDTH // 2, HEIGHT - 35)
 
         # Undo Error Message
         if pygame.time.get_ticks() < self.undo_msg_time:
@@ -506,8 +559,7 @@ class ChessGame:
 
         # Friend Resign Overlay
         if self.friend_resign_choice:
-            s = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            s.fill((0, 0, 0, 180)); self.screen.blit(s, (0,0))
+            self.screen.blit(self.effects.fill((WIDTH, HEIGHT), (0, 0, 0), 180), (0,0))
             self.draw_text_centered("Who is Resigning?", self.font_menu, COLOR_TEXT_WHITE, WIDTH // 2, HEIGHT // 2 - 80)
             btns = [("White", WIDTH // 2 - 80, chess.WHITE), ("Black", WIDTH // 2 + 80, chess.BLACK)]
             for text, cx, side in btns:
@@ -528,8 +580,7 @@ class ChessGame:
                 self.draw_text_centered(UNICODE_PIECES[piece.symbol()], self.font_large, COLOR_TEXT_WHITE, mouse_pos[0], mouse_pos[1])
 
         if self.game_over:
-            s = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-            s.fill((0, 0, 0, 220)); self.screen.blit(s, (0,0))
+            self.screen.blit(self.effects.fill((WIDTH, HEIGHT), (0, 0, 0), 220), (0,0))
             
             if self.winner == "Resigned":
                 if self.difficulty != "friend":
@@ -561,10 +612,12 @@ class ChessGame:
         if self.promotion_choice_move:
             self.draw_promotion_selector()
 
+        if self.hud.visible:
+            self.hud.draw(self.screen, len(self.particles), self.ai, self.ai_search_start)
+
     def draw_promotion_selector(self):
         mouse_pos = pygame.mouse.get_pos()
-        s = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA)
-        s.fill((0, 0, 0, 200)); self.screen.blit(s, (0,0))
+        self.screen.blit(self.effects.fill((WIDTH, HEIGHT), (0, 0, 0), 200), (0,0))
         
         self.draw_text_centered("Select Promotion Piece", self.font_menu, COLOR_TEXT_WHITE, WIDTH // 2, HEIGHT // 2 - 100)
         
@@ -598,169 +651,209 @@ class ChessGame:
             rect = pygame.Rect(cx - w // 2, y_top, w, 40)
             color = COLOR_BUTTON_HOVER if rect.collidepoint(mouse_pos) else COLOR_BUTTON
             pygame.draw.rect(self.screen, color, rect, border_radius=10)
-            self.draw_text_centered(text, pygame.font.SysFont("segoe ui", 16), COLOR_TEXT_WHITE, cx, y_top + 20)
+            self.draw_text_centered(text, self.font_button, COLOR_TEXT_WHITE, cx, y_top + 20)
         return btns
 
     def run(self):
-        in_menu = True
-        ai_thinking_start = None
         while True:
-            self.clock.tick(60)
-            self.update_effects()
-            if in_menu:
-                if self.draw_menu() == False: in_menu = False; self.last_time_update = pygame.time.get_ticks()
-                continue
-            if not self.game_over and self.time_limit and self.last_time_update:
-                dt = (pygame.time.get_ticks() - self.last_time_update) / 1000.0
-                self.last_time_update = pygame.time.get_ticks()
-                if self.board.turn == chess.WHITE: self.white_time -= dt
-                else: self.black_time -= dt
-                if self.white_time <= 0 or self.black_time <= 0: 
-                    self.game_over = True; self.winner = "Timeout"
-                    self.game_over_timer = pygame.time.get_ticks()
-
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT: pygame.quit(); sys.exit()
-                if self.menu_transition_time and pygame.time.get_ticks() >= self.menu_transition_time:
-                    in_menu = True; self.menu_transition_time = None; continue
-
-                if not self.game_over and self.animating_move is None and self.undo_stack_count == 0:
-                    if event.type == pygame.MOUSEBUTTONDOWN:
-                        pos = pygame.mouse.get_pos()
-                        # --- CLICK LOGIC: BUTTONS (AI Mode Only) ---
-                        if self.difficulty != "friend" and pos[1] > HEIGHT - 60:
-                            # Resign (cx=55, w=80)
-                            if 15 < pos[0] < 95: 
-                                self.game_over = True; self.winner = "Resigned"; self.play_sound('click')
-                                self.game_over_timer = pygame.time.get_ticks()
-                                self.menu_transition_time = pygame.time.get_ticks() + 3000
-                            # Hint (cx=150, w=80) 
-                            elif 110 < pos[0] < 190:
-                                count = self.hints_left
+            self.step()
+
+    def pace_frame(self):
+        # Adaptive frame pacing: while the AI thread searches (and no capture
+        # particles are flying) render at SEARCH_FPS with static effects, so
+        # the search gets most of the interpreter; full quality when idle
+        searching = self.ai_thread is not None and self.ai_thread.is_alive()
+        self.reduced_effects = (self.throttle_while_searching and searching
+                                and not self.particles and self.animating_move is None)
+        self.clock.tick(SEARCH_FPS if self.reduced_effects else IDLE_FPS)
+
+    def step(self):
+        # One frame: pacing, clocks, input, game logic, drawing
+        self.pace_frame()
+        # The HUD hooks below are skipped entirely unless it is on
+        hud = self.hud if self.hud.active else None
+        if hud: hud.begin_frame()
+        self.update_effects()
+        if self.in_menu:
+            if self.draw_menu() == False: self.in_menu = False; self.last_time_update = pygame.time.get_ticks()
+            return
+        if not self.game_over and self.time_limit and self.last_time_update:
+            dt = (pygame.time.get_ticks() - self.last_time_update) / 1000.0
+            self.last_time_update = pygame.time.get_ticks()
+            if self.board.turn == chess.WHITE: self.white_time -= dt
+            else: self.black_time -= dt
+            if self.white_time <= 0 or self.black_time <= 0: 
+                self.game_over = True; self.winner = "Timeout"
+                self.game_over_timer = pygame.time.get_ticks()
+
+        if hud: hud.mark("update")
+
+        events = pygame.event.get()
+        for event in events:
+            if event.type == pygame.QUIT: self.hud.close(); pygame.quit(); sys.exit()
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.screen = self.hud.toggle_overlay(self.screen); continue
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F4:
+                self.screen = self.hud.toggle_trace(self.screen); continue
+            if self.menu_transition_time and pygame.time.get_ticks() >= self.menu_transition_time:
+                self.in_menu = True; self.menu_transition_time = None; continue
+
+            if not self.game_over and self.animating_move is None and self.undo_stack_count == 0:
+                if event.type == pygame.MOUSEBUTTONDOWN:
+                    pos = pygame.mouse.get_pos()
+                    # --- CLICK LOGIC: BUTTONS (AI Mode Only) ---
+                    if self.difficulty != "friend" and pos[1] > HEIGHT - 60:
+                        # Resign (cx=55, w=80)
+                        if 15 < pos[0] < 95: 
+                            self.game_over = True; self.winner = "Resigned"; self.play_sound('click')
+                            self.game_over_timer = pygame.time.get_ticks()
+                            self.menu_transition_time = pygame.time.get_ticks() + 3000
+                        # Hint (cx=150, w=80) 
+                        elif 110 < pos[0] < 190:
+                            count = self.hints_left
+                            if count > 0:
+                                self.hints_left -= 1
+                                self.hint_move = self.hint_bot.get_hint(self.board)
+                                self.play_sound('click')
+                        # Theme (cx=250, w=80)
+                        elif 210 < pos[0] < 290:
+                            self.current_theme_idx = (self.current_theme_idx + 1) % len(self.theme_order)
+                            self.current_theme = self.themes[self.theme_order[self.current_theme_idx]]; self.play_sound('click')
+                        # Sound (cx=350, w=80)
+                        elif 310 < pos[0] < 390:
+                            self.sound_enabled = not self.sound_enabled; self.play_sound('click')
+                        # Undo (cx=445, w=80)
+                        elif 405 < pos[0] < 485:
+                            if len(self.board.move_stack) == 0:
+                                self.undo_msg_time = pygame.time.get_ticks() + 2000
+                            else:
+                                count = self.undos_left
                                 if count > 0:
-                                    self.hints_left -= 1
-                                    self.hint_move = self.ai.get_move(self.board) if self.ai else ChessBot("hard").get_move(self.board)
-                                    self.play_sound('click')
-                            # Theme (cx=250, w=80)
-                            elif 210 < pos[0] < 290:
-                                self.current_theme_idx = (self.current_theme_idx + 1) % len(self.theme_order)
-                                self.current_theme = self.themes[self.theme_order[self.current_theme_idx]]; self.play_sound('click')
-                            # Sound (cx=350, w=80)
-                            elif 310 < pos[0] < 390:
-                                self.sound_enabled = not self.sound_enabled; self.play_sound('click')
-                            # Undo (cx=445, w=80)
-                            elif 405 < pos[0] < 485:
-                                if len(self.board.move_stack) == 0:
-                                    self.undo_msg_time = pygame.time.get_ticks() + 2000
-                                else:
-                                    count = self.undos_left
-                                    if count > 0:
-                                        self.undos_left -= 1
-                                        self.undo_stack_count = 2 if self.ai else 1; self.trigger_next_undo(); self.play_sound('click')
-                            continue
-                        
-                        # --- CLICK LOGIC: Friend Resign ---
-                        if self.difficulty == "friend" and pos[1] > HEIGHT - 60:
-                            if WIDTH // 2 - 50 < pos[0] < WIDTH // 2 + 50:
-                                self.friend_resign_choice = not self.friend_resign_choice; self.play_sound('click')
-                            continue
-                        sq = self.get_square_from_mouse(pos)
-                        if sq is not None:
-                            self.hint_move = None
-                            piece = self.board.piece_at(sq)
-                            if piece and piece.color == self.board.turn:
-                                self.selected_square = sq; self.dragging = True
-                                self.legal_moves = [m for m in self.board.legal_moves if m.from_square == sq]
-                            elif self.selected_square is not None:
-                                move = next((m for m in self.legal_moves if m.to_square == sq), None)
-                                if move:
-                                    if move.promotion:
-                                        self.promotion_choice_move = move
-                                    else:
-                                        self.animating_move = (move, pygame.time.get_ticks(), 300, UNICODE_PIECES[self.board.piece_at(move.from_square).symbol()], self.board.turn, False)
-                                    self.selected_square = None; self.dragging = False; self.legal_moves = []
-                    elif event.type == pygame.MOUSEBUTTONUP and self.dragging:
-                        sq = self.get_square_from_mouse(pygame.mouse.get_pos())
-                        if sq is not None:
+                                    self.undos_left -= 1
+                                    self.undo_stack_count = 2 if self.ai else 1; self.trigger_next_undo(); self.play_sound('click')
+                        continue
+                    
+                    # --- CLICK LOGIC: Friend Resign ---
+                    if self.difficulty == "friend" and pos[1] > HEIGHT - 60:
+                        if WIDTH // 2 - 50 < pos[0] < WIDTH // 2 + 50:
+                            self.friend_resign_choice = not self.friend_resign_choice; self.play_sound('click')
+                        continue
+                    sq = self.get_square_from_mouse(pos)
+                    if sq is not None:
+                        self.hint_move = None
+                        piece = self.board.piece_at(sq)
+                        if piece and piece.color == self.board.turn:
+                            self.selected_square = sq; self.dragging = True
+                            self.legal_moves = [m for m in self.board.legal_moves if m.from_square == sq]
+                        elif self.selected_square is not None:
                             move = next((m for m in self.legal_moves if m.to_square == sq), None)
                             if move:
                                 if move.promotion:
                                     self.promotion_choice_move = move
                                 else:
-                                    if self.board.is_capture(move):
-                                        cx, cy = self.get_square_center(move.to_square)
-                                        self.spawn_particles(cx, cy, (255, 50, 50))
-                                        self.trigger_shake(12)
-                                        self.play_sound('capture')
-                                    else:
-                                        self.play_sound('move')
-                                    self.board.push(move)
-                                    if self.board.is_checkmate(): self.game_over = True
-                                    elif self.board.is_check(): self.play_sound('check')
-                                    if self.board.is_game_over(): 
-                                        self.game_over = True
-                                        self.game_over_timer = pygame.time.get_ticks()
-                                        if self.board.is_checkmate():
-                                            if self.board.turn == self.player_color: self.play_sound('defeat')
-                                            else: self.play_sound('victory')
-                                        else:
-                                            self.play_sound('click')
-                        self.selected_square = None; self.dragging = False; self.legal_moves = []
-            
-            # Auto-Menu Redirect Logic (3 seconds)
-            if self.game_over and self.game_over_timer:
-                if pygame.time.get_ticks() - self.game_over_timer > 3000:
-                    in_menu = True
-                    self.game_over_timer = None
-
-            if self.animating_move:
-                m, st, d, sym, col, undo = self.animating_move
-                if pygame.time.get_ticks() - st >= d:
-                    self.animating_move = None
-                    if undo:
-                        self.trigger_next_undo()
-                    else:
-                        if self.board.is_capture(m): 
-                            self.play_sound('capture')
-                            cx, cy = self.get_square_center(m.to_square)
-                            self.spawn_particles(cx, cy, (255, 50, 50))
-                            self.trigger_shake(12)
-                        else: self.play_sound('move')
-                        
-                        self.board.push(m)
-                        if self.board.is_check(): self.play_sound('check')
-                        if self.board.is_game_over(): 
-                            self.game_over = True
-                            self.game_over_timer = pygame.time.get_ticks()
-                            # Win/Loss Sound Logic
-                            if self.board.is_checkmate():
-                                if self.board.turn == self.player_color: self.play_sound('defeat')
-                                else: self.play_sound('victory')
+                                    self.animating_move = (move, pygame.time.get_ticks(), 300, UNICODE_PIECES[self.board.piece_at(move.from_square).symbol()], self.board.turn, False)
+                                self.selected_square = None; self.dragging = False; self.legal_moves = []
+                elif event.type == pygame.MOUSEBUTTONUP and self.dragging:
+                    sq = self.get_square_from_mouse(pygame.mouse.get_pos())
+                    if sq is not None:
+                        move = next((m for m in self.legal_moves if m.to_square == sq), None)
+                        if move:
+                            if move.promotion:
+                                self.promotion_choice_move = move
                             else:
-                                self.play_sound('click') # Draw or timeout sound
-            elif not self.game_over and self.ai and self.board.turn != self.player_color:
-                if self.ai_thread is None:
-                    # Start AI thinking in a separate thread to prevent "Not Responding"
-                    def ai_think_task(board, ai, q):
-                        move = ai.get_move(board)
-                        q.put(move)
+                                if self.board.is_capture(move):
+                                    cx, cy = self.get_square_center(move.to_square)
+                                    self.spawn_particles(cx, cy, (255, 50, 50))
+                                    self.trigger_shake(12)
+                                    self.play_sound('capture')
+                                else:
+                                    self.play_sound('move')
+                                self.record_move(move)
+                                self.board.push(move)
+                                if self.board.is_checkmate(): self.game_over = True
+                                elif self.board.is_check(): self.play_sound('check')
+                                if self.board.is_game_over(): 
+                                    self.game_over = True
+                                    self.game_over_timer = pygame.time.get_ticks()
+                                    if self.board.is_checkmate():
+                                        if self.board.turn == self.player_color: self.play_sound('defeat')
+                                        else: self.play_sound('victory')
+                                    else:
+                                        self.play_sound('click')
+                    self.selected_square = None; self.dragging = False; self.legal_moves = []
+        if hud: hud.mark("events")
+        
+        # Auto-Menu Redirect Logic (3 seconds)
+        if self.game_over and self.game_over_timer:
+            if pygame.time.get_ticks() - self.game_over_timer > 3000:
+                self.in_menu = True
+                self.game_over_timer = None
+
+        if self.animating_move:
+            m, st, d, sym, col, undo = self.animating_move
+            if pygame.time.get_ticks() - st >= d:
+                self.animating_move = None
+                if undo:
+                    self.trigger_next_undo()
+                else:
+                    if self.board.is_capture(m): 
+                        self.play_sound('capture')
+                        cx, cy = self.get_square_center(m.to_square)
+                        self.spawn_particles(cx, cy, (255, 50, 50))
+                        self.trigger_shake(12)
+                    else: self.play_sound('move')
                     
-                    self.ai_thread = threading.Thread(target=ai_think_task, args=(self.board.copy(), self.ai, self.ai_queue))
-                    self.ai_thread.daemon = True
-                    self.ai_thread.start()
+                    self.record_move(m)
+                    self.board.push(m)
+                    if self.board.is_check(): self.play_sound('check')
+                    if self.board.is_game_over(): 
+                        self.game_over = True
+                        self.game_over_timer = pygame.time.get_ticks()
+                        # Win/Loss Sound Logic
+                        if self.board.is_checkmate():
+                            if self.board.turn == self.player_color: self.play_sound('defeat')
+                            else: self.play_sound('victory')
+                        else:
+                            self.play_sound('click') # Draw or timeout sound
+        elif not self.game_over and self.ai and self.board.turn != self.player_color:
+            if self.ai_thread is None:
+                # Start AI thinking in a separate thread to prevent "Not Responding"
+                def ai_think_task(board, ai, q):
+                    move = ai.get_move(board)
+                    q.put(move)
                 
-                # Check if AI is finished
-                try:
-                    move = self.ai_queue.get_nowait()
-                    if move:
-                        if move.promotion: move.promotion = chess.QUEEN
-                        self.animating_move = (move, pygame.time.get_ticks(), 500, UNICODE_PIECES[self.board.piece_at(move.from_square).symbol()], self.board.turn, False)
-                    self.ai_thread = None
-                except queue.Empty:
-                    pass # Still thinking... main loop continues to run!
-
-            if self.game_over and pygame.key.get_pressed()[pygame.K_r]: self.reset_game()
-            self.draw_game(); pygame.display.flip()
+                self.ai_thread = threading.Thread(target=ai_think_task, args=(self.board.copy(), self.ai, self.ai_queue))
+                self.ai_thread.daemon = True
+                self.ai_search_start = time.perf_counter()
+                self.ai_thread.start()
+            
+            # Check if AI is finished
+            try:
+                move = self.ai_queue.get_nowait()
+                self.ai_move_stats = dict(self.ai.last_stats)
+                if self.hud.tracing:
+                    self.hud.ai_search(self.ai_search_start, self.ai_search_start + self.ai_move_stats["time"], self.ai_move_stats)
+                self.ai_search_start = None
+                if move:
+                    if move.promotion: move.promotion = chess.QUEEN
+                    self.animating_move = (move, pygame.time.get_ticks(), 500, UNICODE_PIECES[self.board.piece_at(move.from_square).symbol()], self.board.turn, False)
+                self.ai_thread = None
+            except queue.Empty:
+                pass # Still thinking... main loop continues to run!
+
+        if self.game_over and self.recorder.game_id is not None: self.record_result()
+        if self.game_over and pygame.key.get_pressed()[pygame.K_r]: self.reset_game()
+        if hud: hud.mark("logic")
+        # With static effects only input and the clocks change the picture
+        frame = (self.reduced_effects, int(self.white_time or 0), int(self.black_time or 0))
+        if not self.reduced_effects or events or self.hud.visible or frame != self.drawn_frame:
+            self.drawn_frame = frame
+            self.draw_game()
+            if hud: hud.mark("draw")
+            pygame.display.flip()
+        if hud:
+            hud.mark("flip")
+            hud.end_frame(len(self.particles))
 
 if __name__ == "__main__":
     game = ChessGame(); game.run()
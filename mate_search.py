@@ -0,0 +1,175 @@
+import argparse
+import time
+
+import chess
+
+from search_board import SearchBoard, zero_weights
+
+# Proof-number search for forced mates. The side to move (the attacker) only
+# plays checking moves and the defender, always in check, answers with every
+# legal move, so the tree stays narrow and mates far beyond the alpha-beta
+# horizon are found in a few thousand nodes. Each node carries a proof number
+# (how many leaves still have to be shown to be mates) and a disproof number;
+# every iteration expands the most-proving leaf and backs the numbers up to
+# the root, until the root is proven, disproven or the node budget is spent.
+
+MATE_NODES = 5_000  # Default node budget (about half a second when it runs out)
+INFINITY = 1 << 30
+TIME_CHECK_EVERY = 64  # Iterations between time limit checks
+
+_WEIGHTS = zero_weights()  # Mate search doesn't need SearchBoard's score
+
+
+class _Node:
+    __slots__ = ("move", "pn", "dn", "moves", "children")
+
+    def __init__(self, move):
+        self.move = move
+        self.pn = 1
+        self.dn = 1
+        self.moves = None     # Moves to expand with, found while evaluating the node
+        self.children = None  # None until expanded
+
+
+class MateSearch:
+    def __init__(self, node_limit=MATE_NODES, time_limit=None):
+        self.node_limit = node_limit
+        self.time_limit = time_limit
+        self.nodes = 0
+        self.mate_in = None
+
+    def search(self, board, history=None):
+        """Forced mate line for the side to move (a list of chess.Move), or None.
+
+        None means no mate exists with checks only, or none was proven within
+        the node/time budget. history is passed on to SearchBoard for boards
+        without a move stack.
+        """
+        self.nodes = 0
+        self.mate_in = None
+        stop_time = time.perf_counter() + self.time_limit if self.time_limit is not None else None
+        search = SearchBoard(board, _WEIGHTS, history)
+        root = _Node(None)
+        self._evaluate(root, search, True)
+
+        iterations = 0
+        while root.pn and root.dn and self.nodes < self.node_limit:
+            if stop_time and iterations % TIME_CHECK_EVERY == 0 and time.perf_counter() >= stop_time:
+                break
+            iterations += 1
+            # Walk down to the most-proving leaf: the attacker's child that is
+            # easiest to prove, the defender's child that is easiest to disprove
+            node, attacker, path = root, True, []
+            while node.children is not None:
+                if attacker:
+                    child = min(node.children, key=lambda c: c.pn)
+                else:
+                    child = min(node.children, key=lambda c: c.dn)
+                path.append((node, attacker, child.move, search.make(child.move)))
+                node, attacker = child, not attacker
+            self._expand(node, search, attacker)
+            self._update(node, attacker)
+            for parent, parent_attacker, move, undo in reversed(path):
+                search.unmake(move, undo)
+                self._update(parent, parent_attacker)
+
+        if root.pn:
+            return None
+        line = self._line(root, True)
+        self.mate_in = (len(line) + 1) // 2
+        return [search.to_move(move) for move in line]
+
+    def _evaluate(self, node, board, attacker):
+        # Sets the proof and disproof numbers of a new node; a mate has proof
+        # number 0, a position without a forced mate disproof number 0
+        window = board.halfmove
+        if (board.is_insufficient_material() or board.is_draw_by_rule()
+                or (window and board.key in board.keys[-1 - window:-1])):
+            # A repetition along the checks means the defender got away
+            node.pn, node.dn = INFINITY, 0
+            return
+        moves = board.generate_moves()
+        if attacker:
+            moves = [m for m in moves if board.gives_check(m)]
+            if not moves:
+                node.pn, node.dn = INFINITY, 0
+            else:
+                node.pn, node.dn = 1, len(moves)
+        elif not moves:
+            # The defender is always in check here, so no moves is mate
+            node.pn, node.dn = 0, INFINITY
+        else:
+            node.pn, node.dn = len(moves), 1
+        node.moves = moves
+
+    def _expand(self, node, board, attacker):
+        node.children = []
+        for move in node.moves:
+            child = _Node(move)
+            undo = board.make(move)
+            self._evaluate(child, board, not attacker)
+            board.unmake(move, undo)
+            node.children.append(child)
+        node.moves = None
+        self.nodes += len(node.children)
+
+    @staticmethod
+    def _update(node, attacker):
+        children = node.children
+        if attacker:
+            node.pn = min(c.pn for c in children)
+            node.dn = min(sum(c.dn for c in children), INFINITY)
+        else:
+            node.pn = min(sum(c.pn for c in children), INFINITY)
+            node.dn = min(c.dn for c in children)
+        if node.dn == 0:
+            # Disproven subtrees are never visited again
+            node.children = []
+
+    def _line(self, node, attacker):
+        # Principal variation through the proof tree: the attacker's quickest
+        # mate against the defender's longest resistance
+        lengths = {}
+
+        def length(node, attacker):
+            if node.children is None:
+                return 0
+            key = id(node)
+            if key not in lengths:
+                if attacker:
+                    lengths[key] = 1 + min(length(c, False) for c in node.children if c.pn == 0)
+                else:
+                    lengths[key] = 1 + max(length(c, True) for c in node.children)
+            return lengths[key]
+
+        line = []
+        while node.children is not None:
+            if attacker:
+                node = min((c for c in node.children if c.pn == 0), key=lambda c: length(c, False))
+            else:
+                node = max(node.children, key=lambda c: length(c, True))
+            line.append(node.move)
+            attacker = not attacker
+        return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Look for a forced mate with checks in a position.")
+    parser.add_argument("fen")
+    parser.add_argument("-n", "--nodes", type=int, default=MATE_NODES)
+    args = parser.parse_args(argv)
+
+    board = chess.Board(args.fen)
+    search = MateSearch(args.nodes)
+    start = time.perf_counter()
+    line = search.search(board)
+    elapsed = time.perf_counter() - start
+    if line:
+        print(f"mate in {search.mate_in}: {board.variation_san(line)}")
+    else:
+        print("no forced mate found")
+    print(f"{search.nodes:,} nodes in {elapsed:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
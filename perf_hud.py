@@ -0,0 +1,246 @@
+import gc
+import json
+import threading
+import time
+from collections import deque
+
+import pygame
+
+# Performance overlay and trace recorder for the game window. F3 shows frame
+# times, draw calls, particles, the AI search and GC pauses on screen; F4
+# records the same data as Chrome trace events (chrome://tracing, Perfetto).
+# Nothing is hooked while both are off: the draw-call counters (a wrapper
+# around the screen and patched pygame.draw functions) and the GC callback
+# are only installed while the overlay or a recording is active.
+
+FRAME_SAMPLES = 240       # Frames kept for the percentiles
+GC_WINDOW = 5.0           # Seconds of GC pauses summarized on the overlay
+MAX_TRACE_EVENTS = 500_000
+COUNTED_DRAW_FUNCTIONS = ("rect", "circle", "line", "lines", "aaline", "aalines", "polygon", "ellipse", "arc")
+PANEL_COLOR = (0, 0, 0, 170)
+TEXT_COLOR = (120, 255, 120)
+
+# Trace thread ids
+RENDER_TID = 1
+AI_TID = 2
+
+
+class CountingSurface:
+    """Stands in for the screen surface and counts blits and fills."""
+
+    def __init__(self, surface, counts):
+        self.surface = surface
+        self.counts = counts
+
+    def blit(self, *args, **kwargs):
+        self.counts["blit"] += 1
+        return self.surface.blit(*args, **kwargs)
+
+    def fill(self, *args, **kwargs):
+        self.counts["fill"] += 1
+        return self.surface.fill(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.surface, name)
+
+
+def _counting(function, counts):
+    def draw(surface, *args, **kwargs):
+        counts["draw"] += 1
+        if isinstance(surface, CountingSurface):
+            surface = surface.surface
+        return function(surface, *args, **kwargs)
+    return draw
+
+
+def _percentile(ordered, p):
+    return ordered[round(p / 100 * (len(ordered) - 1))] if ordered else 0.0
+
+
+class PerfHUD:
+    def __init__(self, trace_path):
+        self.trace_path = trace_path
+        self.visible = False
+        self.tracing = False
+        self.counts = {"blit": 0, "fill": 0, "draw": 0}
+        self.frame_counts = dict(self.counts)
+        self.frame_intervals = deque(maxlen=FRAME_SAMPLES)
+        self.frame_work = deque(maxlen=FRAME_SAMPLES)
+        self.gc_pauses = deque()  # (end time, duration)
+        self.events = []
+        self.dropped = 0
+        self.origin = time.perf_counter()
+        self.frame_start = None
+        self.last_frame_start = None
+        self.mark_time = None
+        self.gc_start = None
+        self.original_draw = {}
+        self.font = None
+        self.panel = None
+
+    @property
+    def active(self):
+        return self.visible or self.tracing
+
+    # --- Enabling ---
+
+    def toggle_overlay(self, screen):
+        """Shows or hides the overlay; returns the surface the game should draw on."""
+        self.visible = not self.visible
+        return self._update_hooks(screen)
+
+    def toggle_trace(self, screen):
+        """Starts or stops recording; a stopped recording is written to trace_path."""
+        if self.tracing:
+            self.tracing = False
+            self.save_trace()
+        else:
+            self.tracing = True
+            self.events = []
+            self.dropped = 0
+            self.origin = time.perf_counter()
+            self._thread_names()
+        return self._update_hooks(screen)
+
+    def _update_hooks(self, screen):
+        window = screen.surface if isinstance(screen, CountingSurface) else screen
+        if self.active and not self.original_draw:
+            for name in COUNTED_DRAW_FUNCTIONS:
+                function = getattr(pygame.draw, name)
+                self.original_draw[name] = function
+                setattr(pygame.draw, name, _counting(function, self.counts))
+            gc.callbacks.append(self._gc_callback)
+            self.frame_intervals.clear()
+            self.frame_work.clear()
+            self.last_frame_start = None
+        elif not self.active and self.original_draw:
+            for name, function in self.original_draw.items():
+                setattr(pygame.draw, name, function)
+            self.original_draw = {}
+            gc.callbacks.remove(self._gc_callback)
+        return CountingSurface(window, self.counts) if self.active else window
+
+    def close(self):
+        if self.tracing:
+            self.tracing = False
+            self.save_trace()
+
+    # --- Recording ---
+
+    def _now_us(self):
+        return (time.perf_counter() - self.origin) * 1e6
+
+    def _event(self, event):
+        if len(self.events) < MAX_TRACE_EVENTS:
+            self.events.append(event)
+        else:
+            self.dropped += 1
+
+    def _thread_names(self):
+        for tid, name in ((RENDER_TID, "render"), (AI_TID, "AI search")):
+            self.events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}})
+
+    def span(self, name, start, end, tid=RENDER_TID, args=None):
+        # start/end are perf_counter() seconds
+        if self.tracing:
+            event = {"name": name, "ph": "X", "pid": 1, "tid": tid,
+                     "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6}
+            if args:
+                event["args"] = args
+            self._event(event)
+
+    def instant(self, name, args=None):
+        if self.tracing:
+            event = {"name": name, "ph": "i", "s": "t", "pid": 1, "tid": RENDER_TID, "ts": self._now_us()}
+            if args:
+                event["args"] = args
+            self._event(event)
+
+    def begin_frame(self):
+        now = time.perf_counter()
+        if self.last_frame_start is not None:
+            self.frame_intervals.append(now - self.last_frame_start)
+        self.last_frame_start = self.frame_start = self.mark_time = now
+        for key in self.counts:
+            self.counts[key] = 0
+
+    def mark(self, name):
+        # Closes the frame section that started at the previous mark
+        now = time.perf_counter()
+        self.span(name, self.mark_time, now)
+        self.mark_time = now
+
+    def end_frame(self, particles):
+        now = time.perf_counter()
+        self.frame_work.append(now - self.frame_start)
+        self.frame_counts = dict(self.counts)
+        if self.tracing:
+            self.span("frame", self.frame_start, now)
+            self._event({"name": "frame", "ph": "C", "pid": 1, "ts": (self.frame_start - self.origin) * 1e6,
+                         "args": {"draw calls": sum(self.frame_counts.values()), "particles": particles}})
+
+    def ai_search(self, start, end, stats):
+        self.span("search", start, end, AI_TID, stats)
+
+    def _gc_callback(self, phase, info):
+        if phase == "start":
+            self.gc_start = time.perf_counter()
+        elif self.gc_start is not None:
+            end = time.perf_counter()
+            self.gc_pauses.append((end, end - self.gc_start))
+            tid = RENDER_TID if threading.current_thread() is threading.main_thread() else AI_TID
+            self.span(f"gc gen{info['generation']}", self.gc_start, end, tid, {"collected": info["collected"]})
+            self.gc_start = None
+
+    def save_trace(self):
+        with open(self.trace_path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms",
+                       "otherData": {"dropped_events": self.dropped}}, f)
+        print(f"Wrote {len(self.events)} trace events to {self.trace_path}")
+        self.events = []
+
+    # --- Overlay ---
+
+    def lines(self, particles, ai, ai_search_start):
+        intervals = sorted(self.frame_intervals)
+        work = sorted(self.frame_work)
+        now = time.perf_counter()
+        while self.gc_pauses and now - self.gc_pauses[0][0] > GC_WINDOW:
+            self.gc_pauses.popleft()
+        gc_max = max((d for _, d in self.gc_pauses), default=0.0)
+        counts = self.frame_counts
+        lines = [
+            f"frame  p50 {_percentile(intervals, 50) * 1000:5.1f}  p99 {_percentile(intervals, 99) * 1000:5.1f} ms",
+            f"work   p50 {_percentile(work, 50) * 1000:5.1f}  p99 {_percentile(work, 99) * 1000:5.1f} ms",
+            f"draw   {sum(counts.values())} (blit {counts['blit']}, draw {counts['draw']}, fill {counts['fill']})",
+            f"particles {particles}",
+            f"gc     {len(self.gc_pauses)} in {GC_WINDOW:.0f}s, max {gc_max * 1000:.1f} ms",
+        ]
+        if ai is None:
+            lines.append("ai     -")
+        elif ai_search_start is not None:
+            lines.append(f"ai     thinking {now - ai_search_start:4.1f}s  depth {ai.completed_depth}  nodes {ai.nodes}")
+        elif ai.last_stats:
+            stats = ai.last_stats
+            lines.append(f"ai     last {stats['time']:.2f}s  depth {stats['depth']}  {stats['nps']} nps"
+                         + ("  cached" if stats["cached"] else ""))
+        else:
+            lines.append("ai     idle")
+        if self.tracing:
+            lines.append(f"REC    {len(self.events)} events")
+        return lines
+
+    def draw(self, screen, particles, ai, ai_search_start):
+        window = screen.surface if isinstance(screen, CountingSurface) else screen
+        if self.font is None:
+            self.font = pygame.font.SysFont("consolas", 13)
+        lines = self.lines(particles, ai, ai_search_start)
+        height = self.font.get_linesize()
+        size = (window.get_width() - 8, height * len(lines) + 8)
+        if self.panel is None or self.panel.get_size() != size:
+            self.panel = pygame.Surface(size, pygame.SRCALPHA)
+        self.panel.fill(PANEL_COLOR)
+        for i, line in enumerate(lines):
+            self.panel.blit(self.font.render(line, True, TEXT_COLOR), (4, 4 + i * height))
+        # Drawn on the real window so the overlay doesn't count itself
+        window.blit(self.panel, (4, 4))
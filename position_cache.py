@@ -0,0 +1,150 @@
+import sqlite3
+import threading
+import time
+
+import chess
+import chess.polyglot
+
+# Search results keyed by Zobrist hash + search depth, stored in SQLite. The
+# hash is combined with a fingerprint of the evaluation weights, so scores
+# from an old eval_weights.json are never returned once the weights change
+# (they are left for LRU eviction).
+# WAL mode lets any number of processes read while one of them writes, so
+# every game window and analysis worker can share the same file.
+
+MAX_ENTRIES = 1_000_000   # Size cap before least recently used rows are evicted
+EVICT_CHECK_EVERY = 1000  # Inserts between size checks
+EVICT_TO = 0.9            # Fraction of MAX_ENTRIES kept after an eviction
+READ_TIMEOUT = 0.05       # Seconds a lookup waits on a locked database before it counts as a miss
+MAX_PENDING_TOUCHES = 10_000  # Hits remembered for the next last_used flush
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS positions (
+    key INTEGER NOT NULL,
+    depth INTEGER NOT NULL,
+    move TEXT,
+    score INTEGER,
+    last_used INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (key, depth)
+) WITHOUT ROWID
+"""
+
+
+def zobrist_key(board, weights_key=0):
+    # SQLite integers are signed 64-bit
+    key = chess.polyglot.zobrist_hash(board) ^ weights_key
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+class PositionCache:
+    def __init__(self, path, max_entries=MAX_ENTRIES, timeout=30.0, read_timeout=READ_TIMEOUT):
+        self.path = path
+        self.max_entries = max_entries
+        self.inserts = 0
+        self.hits = 0
+        self.misses = 0
+        # Writer connection shared by the UI and AI threads, serialized by a lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(positions)")]
+        if "last_used" not in columns:
+            self.conn.execute("ALTER TABLE positions ADD COLUMN last_used INTEGER NOT NULL DEFAULT 0")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS positions_lru ON positions (last_used)")
+        # Lookups use their own connection and never write, so they don't
+        # queue behind a put() or another process's write transaction. Hits
+        # are remembered in `touched` and their last_used stamps are written
+        # by the next put().
+        self.read_lock = threading.Lock()
+        self.reader = sqlite3.connect(path, timeout=read_timeout, isolation_level=None, check_same_thread=False)
+        self.touched = {}
+
+    def get(self, board, depth, weights_key=0):
+        key = zobrist_key(board, weights_key)
+        try:
+            with self.read_lock:
+                row = self.reader.execute(
+                    "SELECT move, score FROM positions WHERE key = ? AND depth = ?", (key, depth)
+                ).fetchone()
+                if row is not None and len(self.touched) < MAX_PENDING_TOUCHES:
+                    self.touched[key, depth] = int(time.time())
+        except sqlite3.Error:
+            # A busy or broken cache must never stop a search
+            return None
+
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        move, score = row
+        return (chess.Move.from_uci(move) if move else None), score
+
+    def put(self, board, depth, move, score, weights_key=0):
+        try:
+            with self.lock:
+                self.conn.execute("BEGIN")
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO positions (key, depth, move, score, last_used) VALUES (?, ?, ?, ?, ?)",
+                    (zobrist_key(board, weights_key), depth, move.uci() if move else None,
+                     int(score) if score is not None else None, int(time.time()))
+                )
+                self._flush_touched()
+                self.conn.execute("COMMIT")
+                self.inserts += 1
+                if self.inserts % EVICT_CHECK_EVERY == 0:
+                    self._evict()
+        except sqlite3.Error:
+            self._rollback()
+
+    def _flush_touched(self):
+        # Writes the last_used stamps of the hits since the last flush; the
+        # caller holds self.lock and commits
+        with self.read_lock:
+            touched, self.touched = self.touched, {}
+        try:
+            self.conn.executemany(
+                "UPDATE positions SET last_used = ? WHERE key = ? AND depth = ?",
+                [(used, key, depth) for (key, depth), used in touched.items()]
+            )
+        except sqlite3.Error:
+            # Kept for the next flush
+            with self.read_lock:
+                touched.update(self.touched)
+                self.touched = touched
+            raise
+
+    def _rollback(self):
+        try:
+            if self.conn.in_transaction:
+                self.conn.execute("ROLLBACK")
+        except sqlite3.Error:
+            pass
+
+    def _evict(self):
+        count = self.conn.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * EVICT_TO)
+        self.conn.execute(
+            "DELETE FROM positions WHERE (key, depth) IN "
+            "(SELECT key, depth FROM positions ORDER BY last_used LIMIT ?)", (excess,)
+        )
+
+    def __len__(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM positions").fetchone()[0]
+
+    def close(self):
+        with self.lock:
+            if self.touched:
+                try:
+                    self.conn.execute("BEGIN")
+                    self._flush_touched()
+                    self.conn.execute("COMMIT")
+                except sqlite3.Error:
+                    self._rollback()
+            self.conn.close()
+        with self.read_lock:
+            self.reader.close()
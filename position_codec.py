@@ -0,0 +1,174 @@
+import argparse
+import pickle
+import random
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import chess
+import chess.polyglot
+
+# Fixed-size binary snapshots of a chess.Board for shipping positions to
+# worker processes. A snapshot holds the 12 piece bitboards, side to move,
+# castling rights, en passant square, both clocks and the Zobrist hashes of
+# the positions since the last irreversible move (newest first), which is all
+# a search needs for repetition checks. It is a numpy record, so thousands of
+# them can be packed into one array or shared memory block.
+
+REPETITION_SLOTS = 16
+NO_SQUARE = 255
+
+SNAPSHOT = np.dtype([
+    ("bitboards", "<u8", 12),   # White P N B R Q K, then Black
+    ("turn", "u1"),
+    ("castling", "u1"),         # Bits: a1, h1, a8, h8 rooks
+    ("ep_square", "u1"),        # NO_SQUARE if none
+    ("halfmove", "<u2"),
+    ("fullmove", "<u2"),
+    ("rep_count", "u1"),
+    ("rep_hashes", "<u8", REPETITION_SLOTS),
+])
+SNAPSHOT_SIZE = SNAPSHOT.itemsize
+
+CASTLING_SQUARES = [chess.A1, chess.H1, chess.A8, chess.H8]
+PIECE_ATTRS = ["pawns", "knights", "bishops", "rooks", "queens", "kings"]
+
+
+def repetition_hashes(board, slots=REPETITION_SLOTS):
+    """Zobrist hashes of earlier positions that can still repeat, newest first."""
+    plies = min(board.halfmove_clock, len(board.move_stack), slots)
+    if plies == 0:
+        return []
+    earlier = board.copy(stack=plies)
+    hashes = []
+    for _ in range(plies):
+        earlier.pop()
+        hashes.append(chess.polyglot.zobrist_hash(earlier))
+    return hashes
+
+
+def encode_into(record, board):
+    white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+    masks = [getattr(board, attr) for attr in PIECE_ATTRS]
+    record["bitboards"] = [m & white for m in masks] + [m & black for m in masks]
+    record["turn"] = board.turn
+    record["castling"] = sum(1 << i for i, sq in enumerate(CASTLING_SQUARES) if board.castling_rights & chess.BB_SQUARES[sq])
+    record["ep_square"] = NO_SQUARE if board.ep_square is None else board.ep_square
+    record["halfmove"] = min(board.halfmove_clock, 0xFFFF)
+    record["fullmove"] = min(board.fullmove_number, 0xFFFF)
+    hashes = repetition_hashes(board)
+    record["rep_count"] = len(hashes)
+    record["rep_hashes"][:len(hashes)] = hashes
+    record["rep_hashes"][len(hashes):] = 0
+
+
+def decode_record(record):
+    """Returns (chess.Board, repetition hashes) for one snapshot record."""
+    bitboards = [int(b) for b in record["bitboards"]]
+    board = chess.Board(None)
+    for i, attr in enumerate(PIECE_ATTRS):
+        setattr(board, attr, bitboards[i] | bitboards[6 + i])
+    board.occupied_co[chess.WHITE] = bitboards[0] | bitboards[1] | bitboards[2] | bitboards[3] | bitboards[4] | bitboards[5]
+    board.occupied_co[chess.BLACK] = bitboards[6] | bitboards[7] | bitboards[8] | bitboards[9] | bitboards[10] | bitboards[11]
+    board.occupied = board.occupied_co[chess.WHITE] | board.occupied_co[chess.BLACK]
+    board.promoted = chess.BB_EMPTY
+    board.turn = bool(record["turn"])
+    castling = int(record["castling"])
+    board.castling_rights = chess.BB_EMPTY
+    for i, sq in enumerate(CASTLING_SQUARES):
+        if castling & (1 << i):
+            board.castling_rights |= chess.BB_SQUARES[sq]
+    ep = int(record["ep_square"])
+    board.ep_square = None if ep == NO_SQUARE else ep
+    board.halfmove_clock = int(record["halfmove"])
+    board.fullmove_number = int(record["fullmove"])
+    hashes = [int(h) for h in record["rep_hashes"][:int(record["rep_count"])]]
+    return board, hashes
+
+
+def encode(board):
+    """Snapshot of one board as SNAPSHOT_SIZE bytes."""
+    record = np.zeros(1, dtype=SNAPSHOT)
+    encode_into(record[0], board)
+    return record.tobytes()
+
+
+def decode(data):
+    return decode_record(np.frombuffer(data, dtype=SNAPSHOT, count=1)[0])
+
+
+def encode_batch(boards, out=None):
+    """Packs boards into a SNAPSHOT array (or into `out`, e.g. a shared buffer view)."""
+    records = np.zeros(len(boards), dtype=SNAPSHOT) if out is None else out
+    for record, board in zip(records, boards):
+        encode_into(record, board)
+    return records
+
+
+def decode_batch(records):
+    return [decode_record(record) for record in records]
+
+
+class SharedSnapshots:
+    """A block of snapshots in shared memory that worker processes attach to by name.
+
+    The creator owns the block and must call unlink() when done; workers
+    attach with SharedSnapshots(name=..., count=...) and only close().
+    """
+
+    def __init__(self, count, name=None):
+        create = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=max(count * SNAPSHOT_SIZE, 1))
+        self.count = count
+        self.records = np.ndarray((count,), dtype=SNAPSHOT, buffer=self.shm.buf)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def write(self, boards, start=0):
+        encode_batch(boards, self.records[start:start + len(boards)])
+
+    def read(self, index):
+        return decode_record(self.records[index])
+
+    def close(self):
+        self.records = None
+        self.shm.close()
+
+    def unlink(self):
+        self.shm.unlink()
+
+
+def benchmark(n=10_000):
+    rng = random.Random(0)
+    boards = []
+    for _ in range(n):
+        board = chess.Board()
+        for _ in range(rng.randint(0, 60)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        boards.append(board)
+
+    pickled = sum(len(pickle.dumps(b)) for b in boards[:1000]) / min(n, 1000)
+
+    start = time.perf_counter()
+    records = encode_batch(boards)
+    encode_rate = n / (time.perf_counter() - start)
+    start = time.perf_counter()
+    decoded = decode_batch(records)
+    decode_rate = n / (time.perf_counter() - start)
+    mismatches = sum(b.fen() != d.fen() for b, (d, _) in zip(boards, decoded))
+
+    print(f"snapshot size:  {SNAPSHOT_SIZE} bytes (pickled Board with history: {pickled:.0f} bytes avg)")
+    print(f"encode:         {encode_rate:,.0f} boards/s")
+    print(f"decode:         {decode_rate:,.0f} boards/s")
+    print(f"round trip:     {mismatches} FEN mismatches / {n:,}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark position snapshot encoding.")
+    parser.add_argument("-n", "--positions", type=int, default=10_000)
+    benchmark(parser.parse_args().positions)
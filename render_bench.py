@@ -0,0 +1,102 @@
+import argparse
+import os
+import tempfile
+import time
+
+import chess
+
+# Measures how much the game window slows down the AI search. The same
+# positions are searched three times: by a bare ChessBot, and by the game's
+# AI thread while ChessGame.step() renders frames with and without the
+# search-time throttling of pace_frame(). Reports search time and NPS, the
+# frames drawn, and the longest gap between frames, which bounds how long a
+# click can wait before it is handled.
+
+POSITIONS = [
+    # Black to move, so the AI (playing Black) starts searching at once
+    "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3",
+    "r2q1rk1/ppp2ppp/2np1n2/2b1p1B1/2B1P1b1/2NP1N2/PPP2PPP/R2Q1RK1 b - - 1 8",
+    "r1bq1rk1/pp2bppp/2n1pn2/2pp4/3P4/2PBPN2/PP1N1PPP/R1BQ1RK1 b - - 2 8",
+    "2r2rk1/pp1bqppp/2n1pn2/3p4/3P4/P1NBPN2/1PQ2PPP/2R2RK1 b - - 4 14",
+]
+
+
+def search_alone(level, positions):
+    from chess_ai import ChessBot
+    bot = ChessBot(level)
+    nodes, elapsed = 0, 0.0
+    for fen in positions:
+        bot.get_move(chess.Board(fen))
+        nodes += bot.last_stats["nodes"]
+        elapsed += bot.last_stats["time"]
+    return {"time": elapsed, "nodes": nodes, "frames": 0, "max_gap": 0.0}
+
+
+def search_in_game(game, level, positions, throttle):
+    from chess_ai import ChessBot
+    game.throttle_while_searching = throttle
+    game.ai = ChessBot(level)  # No position cache, so every run really searches
+    drawn = [0]
+    draw_game = game.draw_game
+
+    def counting_draw():
+        drawn[0] += 1
+        draw_game()
+    game.draw_game = counting_draw
+
+    nodes, elapsed, max_gap = 0, 0.0, 0.0
+    for fen in positions:
+        game.board = chess.Board(fen)
+        game.animating_move = None
+        started = False
+        last = time.perf_counter()
+        while True:
+            game.step()
+            now = time.perf_counter()
+            max_gap = max(max_gap, now - last)
+            last = now
+            if game.ai_thread is not None:
+                started = True
+            elif started:
+                break
+        nodes += game.ai_move_stats["nodes"]
+        elapsed += game.ai_move_stats["time"]
+    game.draw_game = draw_game
+    return {"time": elapsed, "nodes": nodes, "frames": drawn[0], "max_gap": max_gap}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark AI search speed while the game window renders.")
+    parser.add_argument("--level", default="hard")
+    parser.add_argument("--headless", action="store_true", help="render with SDL's dummy video driver")
+    args = parser.parse_args(argv)
+
+    if args.headless:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    from main import ChessGame
+
+    # The game log and position cache go to a scratch directory, not the player's files
+    with tempfile.TemporaryDirectory() as scratch:
+        game = ChessGame(os.path.join(scratch, "game_log.jsonl"), os.path.join(scratch, "position_cache.db"))
+        game.in_menu = False
+        game.player_color = chess.WHITE
+        game.sound_enabled = False
+
+        results = {
+            "search only": search_alone(args.level, POSITIONS),
+            "full rendering": search_in_game(game, args.level, POSITIONS, throttle=False),
+            "throttled": search_in_game(game, args.level, POSITIONS, throttle=True),
+        }
+        game.recorder.close()
+        game.position_cache.close()
+
+    base = results["search only"]["time"]
+    print(f"level {args.level}, {len(POSITIONS)} positions")
+    for name, r in results.items():
+        print(f"{name:15} {r['time']:7.2f}s  {int(r['nodes'] / r['time']):>7,} nps  "
+              f"{r['time'] / base:5.2f}x  {r['frames']:5} frames drawn  max frame gap {r['max_gap'] * 1000:5.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
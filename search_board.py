@@ -0,0 +1,603 @@
+import argparse
+import random
+import time
+from array import array
+
+import chess
+import chess.polyglot
+from chess import (BB_ALL, BB_SQUARES, BB_RAYS, BB_KING_ATTACKS, BB_KNIGHT_ATTACKS, BB_PAWN_ATTACKS,
+                   BB_RANK_ATTACKS, BB_FILE_ATTACKS, BB_DIAG_ATTACKS, BB_RANK_MASKS, BB_FILE_MASKS,
+                   BB_DIAG_MASKS, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING)
+
+# Make/unmake board for the search. Pieces live in a mailbox plus per-type and
+# per-color bitboards (python-chess masks and attack tables), moves are ints
+# (from | to << 6 | promotion << 12) collected in array("H") lists, and make()
+# returns an explicit undo record instead of copying board state. The Zobrist
+# key and the material/piece-square score are updated incrementally. Legal
+# moves come out in the same order as chess.Board.generate_legal_moves, so a
+# search on either board visits the same tree. Standard chess only.
+
+# Automatic draws that end the game without a claim (as in board.is_game_over())
+SEVENTYFIVE_MOVE_PLIES = 150
+FIVEFOLD_REPETITIONS = 5
+# A position can recur at the earliest 4 plies later, so fivefold repetition
+# needs at least this many reversible plies
+FIVEFOLD_MIN_PLIES = 4 * (FIVEFOLD_REPETITIONS - 1)
+
+WHITE, BLACK = 1, 0
+PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)  # python-chess generation order
+
+ZOBRIST = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+ZOBRIST_TURN = ZOBRIST[780]
+# PIECE_KEYS[color][piece_type][square]
+PIECE_KEYS = [[[ZOBRIST[64 * ((piece_type - 1) * 2 + color) + sq] for sq in chess.SQUARES] if piece_type else None
+               for piece_type in range(7)] for color in (BLACK, WHITE)]
+CASTLING_KEYS = [(chess.BB_H1, ZOBRIST[768]), (chess.BB_A1, ZOBRIST[769]),
+                 (chess.BB_H8, ZOBRIST[770]), (chess.BB_A8, ZOBRIST[771])]
+BB_BACKRANKS = [chess.BB_RANK_8, chess.BB_RANK_1]
+BB_EP_RANKS = [chess.BB_RANK_4, chess.BB_RANK_5]  # Where a capturer must stand
+BB_DOUBLE_PUSH_RANKS = [chess.BB_RANK_6 | chess.BB_RANK_5, chess.BB_RANK_3 | chess.BB_RANK_4]
+
+
+def encode_move(move):
+    return move.from_square | move.to_square << 6 | (move.promotion or 0) << 12
+
+
+def decode_move(move):
+    return chess.Move(move & 63, move >> 6 & 63, move >> 12 or None)
+
+
+def castling_key(rights):
+    key = 0
+    for mask, value in CASTLING_KEYS:
+        if rights & mask:
+            key ^= value
+    return key
+
+
+def between(a, b):
+    bb = BB_RAYS[a][b] & ((BB_ALL << a) ^ (BB_ALL << b))
+    return bb & (bb - 1)
+
+
+class SearchBoard:
+    def __init__(self, board, weights, history=None):
+        """Copies a chess.Board. weights[color][piece_type][square] are the
+        signed material + piece-square values (White positive) that make up
+        self.score; history is used as the repetition history (newest first)
+        when the board has no move stack."""
+        self.weights = weights
+        self.types = [0] * 64
+        self.bb = [0] * 7
+        self.occ = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        self.occupied = board.occupied
+        self.score = 0
+        for square, piece in board.piece_map().items():
+            color = int(piece.color)
+            self.types[square] = piece.piece_type
+            self.bb[piece.piece_type] |= BB_SQUARES[square]
+            self.score += weights[color][piece.piece_type][square]
+        self.turn = int(board.turn)
+        self.castling = board.clean_castling_rights()
+        self.ep = board.ep_square
+        self.halfmove = board.halfmove_clock
+        self.key = chess.polyglot.zobrist_hash(board)
+
+        # Keys of the positions since the last irreversible move, oldest first
+        earlier = []
+        plies = min(board.halfmove_clock, len(board.move_stack))
+        if plies:
+            replay = board.copy(stack=plies)
+            for _ in range(plies):
+                replay.pop()
+                earlier.append(chess.polyglot.zobrist_hash(replay))
+        elif history and not board.move_stack:
+            earlier = list(history[:board.halfmove_clock])
+        self.keys = earlier[::-1] + [self.key]
+        self.root_keys = len(self.keys)
+
+    # --- Queries ---
+
+    def king(self, color):
+        kings = self.bb[KING] & self.occ[color]
+        return kings.bit_length() - 1 if kings else None
+
+    def attackers(self, color, square, occupied=None):
+        occupied = self.occupied if occupied is None else occupied
+        bb = self.bb
+        queens_and_rooks = bb[QUEEN] | bb[ROOK]
+        queens_and_bishops = bb[QUEEN] | bb[BISHOP]
+        attackers = ((BB_KING_ATTACKS[square] & bb[KING]) |
+                     (BB_KNIGHT_ATTACKS[square] & bb[KNIGHT]) |
+                     (BB_RANK_ATTACKS[square][BB_RANK_MASKS[square] & occupied] & queens_and_rooks) |
+                     (BB_FILE_ATTACKS[square][BB_FILE_MASKS[square] & occupied] & queens_and_rooks) |
+                     (BB_DIAG_ATTACKS[square][BB_DIAG_MASKS[square] & occupied] & queens_and_bishops) |
+                     (BB_PAWN_ATTACKS[color ^ 1][square] & bb[PAWN]))
+        return attackers & self.occ[color]
+
+    def ply(self):
+        # Moves made since this board was created
+        return len(self.keys) - self.root_keys
+
+    def is_check(self):
+        king = self.king(self.turn)
+        return king is not None and bool(self.attackers(self.turn ^ 1, king))
+
+    def is_capture(self, move):
+        return bool(BB_SQUARES[move >> 6 & 63] & self.occ[self.turn ^ 1]) or self.is_en_passant(move)
+
+    def is_en_passant(self, move):
+        to_square = move >> 6 & 63
+        return (to_square == self.ep and self.types[move & 63] == PAWN and
+                (to_square - (move & 63)) & 7 != 0 and not self.types[to_square])
+
+    def gives_check(self, move):
+        undo = self.make(move)
+        check = self.is_check()
+        self.unmake(move, undo)
+        return check
+
+    def is_legal(self, move):
+        return move in self.generate_moves(BB_SQUARES[move & 63])
+
+    def is_insufficient_material(self):
+        bb = self.bb
+        if bb[PAWN] | bb[ROOK] | bb[QUEEN]:
+            return False
+        for color in (WHITE, BLACK):
+            ours, theirs = self.occ[color], self.occ[color ^ 1]
+            if ours & bb[KNIGHT]:
+                if bin(ours).count("1") > 2 or theirs & ~bb[KING] & ~bb[QUEEN]:
+                    return False
+            elif ours & bb[BISHOP]:
+                same_color = not bb[BISHOP] & chess.BB_DARK_SQUARES or not bb[BISHOP] & chess.BB_LIGHT_SQUARES
+                if not same_color or bb[KNIGHT]:
+                    return False
+        return True
+
+    def is_draw_by_rule(self):
+        # Seventy-five-move rule and fivefold repetition, from the halfmove
+        # clock and the key stack instead of replaying moves
+        window = self.halfmove
+        if window >= SEVENTYFIVE_MOVE_PLIES:
+            return True
+        if window < FIVEFOLD_MIN_PLIES:
+            return False
+        return self.keys[-1 - window:-1].count(self.key) >= FIVEFOLD_REPETITIONS - 1
+
+    def ep_key(self):
+        # Polyglot hashes the en passant file only if a pawn could capture there
+        if BB_PAWN_ATTACKS[self.turn ^ 1][self.ep] & self.bb[PAWN] & self.occ[self.turn]:
+            return ZOBRIST[772 + (self.ep & 7)]
+        return 0
+
+    # --- Make / unmake ---
+
+    def make(self, move):
+        """Plays a legal move and returns the record unmake() needs to take it back."""
+        from_square, to_square, promotion = move & 63, move >> 6 & 63, move >> 12
+        us = self.turn
+        them = us ^ 1
+        types, bb, occ = self.types, self.bb, self.occ
+        our_keys, our_weights = PIECE_KEYS[us], self.weights[us]
+        piece = types[from_square]
+        captured = types[to_square]
+        undo = (captured, self.castling, self.ep, self.halfmove, self.key, self.score)
+
+        key = self.key ^ ZOBRIST_TURN
+        if self.ep is not None:
+            key ^= self.ep_key()
+        score = self.score
+        from_bb, to_bb = BB_SQUARES[from_square], BB_SQUARES[to_square]
+
+        bb[piece] ^= from_bb
+        occ[us] ^= from_bb
+        types[from_square] = 0
+        key ^= our_keys[piece][from_square]
+        score -= our_weights[piece][from_square]
+
+        if captured:
+            bb[captured] ^= to_bb
+            occ[them] ^= to_bb
+            key ^= PIECE_KEYS[them][captured][to_square]
+            score -= self.weights[them][captured][to_square]
+        elif piece == PAWN and to_square == self.ep and (to_square - from_square) & 7:
+            square = to_square - 8 if us == WHITE else to_square + 8
+            bb[PAWN] ^= BB_SQUARES[square]
+            occ[them] ^= BB_SQUARES[square]
+            types[square] = 0
+            key ^= PIECE_KEYS[them][PAWN][square]
+            score -= self.weights[them][PAWN][square]
+
+        placed = promotion or piece
+        bb[placed] |= to_bb
+        occ[us] |= to_bb
+        types[to_square] = placed
+        key ^= our_keys[placed][to_square]
+        score += our_weights[placed][to_square]
+
+        if piece == KING and abs(to_square - from_square) == 2:
+            rook_from, rook_to = (from_square + 3, from_square + 1) if to_square > from_square else (from_square - 4, from_square - 1)
+            rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            bb[ROOK] ^= rook_bb
+            occ[us] ^= rook_bb
+            types[rook_from], types[rook_to] = 0, ROOK
+            key ^= our_keys[ROOK][rook_from] ^ our_keys[ROOK][rook_to]
+            score += our_weights[ROOK][rook_to] - our_weights[ROOK][rook_from]
+        self.occupied = occ[0] | occ[1]
+
+        castling = self.castling & ~from_bb & ~to_bb
+        if piece == KING:
+            castling &= ~BB_BACKRANKS[us]
+        if castling != self.castling:
+            key ^= castling_key(self.castling) ^ castling_key(castling)
+            self.castling = castling
+
+        self.ep = None
+        if piece == PAWN or captured:
+            self.halfmove = 0
+            if piece == PAWN and abs(to_square - from_square) == 16:
+                self.ep = (from_square + to_square) >> 1
+        else:
+            self.halfmove += 1
+        self.turn = them
+        if self.ep is not None:
+            key ^= self.ep_key()
+        self.key = key
+        self.keys.append(key)
+        self.score = score
+        return undo
+
+    def unmake(self, move, undo):
+        from_square, to_square, promotion = move & 63, move >> 6 & 63, move >> 12
+        captured, self.castling, self.ep, self.halfmove, self.key, self.score = undo
+        self.keys.pop()
+        them = self.turn
+        us = self.turn = them ^ 1
+        types, bb, occ = self.types, self.bb, self.occ
+        from_bb, to_bb = BB_SQUARES[from_square], BB_SQUARES[to_square]
+
+        placed = types[to_square]
+        piece = PAWN if promotion else placed
+        bb[placed] ^= to_bb
+        occ[us] ^= to_bb
+        bb[piece] |= from_bb
+        occ[us] |= from_bb
+        types[from_square] = piece
+        types[to_square] = captured
+
+        if captured:
+            bb[captured] |= to_bb
+            occ[them] |= to_bb
+        elif piece == PAWN and to_square == self.ep and (to_square - from_square) & 7:
+            square = to_square - 8 if us == WHITE else to_square + 8
+            bb[PAWN] |= BB_SQUARES[square]
+            occ[them] |= BB_SQUARES[square]
+            types[square] = PAWN
+        elif piece == KING and abs(to_square - from_square) == 2:
+            rook_from, rook_to = (from_square + 3, from_square + 1) if to_square > from_square else (from_square - 4, from_square - 1)
+            rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            bb[ROOK] ^= rook_bb
+            occ[us] ^= rook_bb
+            types[rook_from], types[rook_to] = ROOK, 0
+        self.occupied = occ[0] | occ[1]
+
+    # --- Move generation ---
+
+    def generate_moves(self, from_mask=BB_ALL, to_mask=BB_ALL):
+        """Legal moves, in chess.Board.generate_legal_moves order."""
+        moves = array("H")
+        king = self.king(self.turn)
+        if king is None:
+            self._pseudo_legal(moves, from_mask, to_mask, None, 0)
+            return moves
+        blockers = self._slider_blockers(king)
+        checkers = self.attackers(self.turn ^ 1, king)
+        if checkers:
+            self._evasions(moves, king, checkers, blockers, from_mask, to_mask)
+        else:
+            self._pseudo_legal(moves, from_mask, to_mask, king, blockers)
+        return moves
+
+    def generate_captures(self):
+        """Same moves and order as chess.Board.generate_legal_captures."""
+        moves = self.generate_moves(BB_ALL, self.occ[self.turn ^ 1])
+        if self.ep:
+            self._en_passant(moves, BB_ALL, BB_ALL, self.king(self.turn))
+        return moves
+
+    def _slider_blockers(self, king):
+        bb = self.bb
+        rooks_and_queens = bb[ROOK] | bb[QUEEN]
+        bishops_and_queens = bb[BISHOP] | bb[QUEEN]
+        snipers = ((BB_RANK_ATTACKS[king][0] & rooks_and_queens) |
+                   (BB_FILE_ATTACKS[king][0] & rooks_and_queens) |
+                   (BB_DIAG_ATTACKS[king][0] & bishops_and_queens)) & self.occ[self.turn ^ 1]
+        blockers = 0
+        while snipers:
+            sniper = snipers.bit_length() - 1
+            snipers ^= BB_SQUARES[sniper]
+            b = between(king, sniper) & self.occupied
+            if b and b & (b - 1) == 0:
+                blockers |= b
+        return blockers & self.occ[self.turn]
+
+    def _king_safe(self, to_square):
+        return not self.attackers(self.turn ^ 1, to_square)
+
+    def _ep_safe(self, move):
+        undo = self.make(move)
+        king = self.king(self.turn ^ 1)
+        safe = not self.attackers(self.turn, king)
+        self.unmake(move, undo)
+        return safe
+
+    def _piece_attacks(self, piece, square):
+        occupied = self.occupied
+        if piece == KNIGHT:
+            return BB_KNIGHT_ATTACKS[square]
+        if piece == KING:
+            return BB_KING_ATTACKS[square]
+        attacks = 0
+        if piece != ROOK:
+            attacks = BB_DIAG_ATTACKS[square][BB_DIAG_MASKS[square] & occupied]
+        if piece != BISHOP:
+            attacks |= (BB_RANK_ATTACKS[square][BB_RANK_MASKS[square] & occupied] |
+                        BB_FILE_ATTACKS[square][BB_FILE_MASKS[square] & occupied])
+        return attacks
+
+    def _pseudo_legal(self, moves, from_mask, to_mask, king, blockers):
+        # Mirrors chess.Board.generate_pseudo_legal_moves, keeping only the
+        # moves that do not leave the king in check. Pinned pieces are limited
+        # to the line through the king, king moves to unattacked squares.
+        us = self.turn
+        them = us ^ 1
+        types, bb = self.types, self.bb
+        ours = self.occ[us]
+        append = moves.append
+
+        non_pawns = ours & ~bb[PAWN] & from_mask
+        while non_pawns:
+            from_square = non_pawns.bit_length() - 1
+            non_pawns ^= BB_SQUARES[from_square]
+            piece = types[from_square]
+            targets = self._piece_attacks(piece, from_square) & ~ours & to_mask
+            if blockers & BB_SQUARES[from_square]:
+                targets &= BB_RAYS[king][from_square]
+            while targets:
+                to_square = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to_square]
+                if piece != KING or king is None or self._king_safe(to_square):
+                    append(from_square | to_square << 6)
+
+        if from_mask & bb[KING]:
+            self._castling(moves, from_mask, to_mask)
+
+        pawns = bb[PAWN] & ours & from_mask
+        if not pawns:
+            return
+
+        capturers = pawns
+        while capturers:
+            from_square = capturers.bit_length() - 1
+            capturers ^= BB_SQUARES[from_square]
+            targets = BB_PAWN_ATTACKS[us][from_square] & self.occ[them] & to_mask
+            if blockers & BB_SQUARES[from_square]:
+                targets &= BB_RAYS[king][from_square]
+            while targets:
+                to_square = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to_square]
+                move = from_square | to_square << 6
+                if to_square < 8 or to_square >= 56:
+                    for promotion in PROMOTIONS:
+                        append(move | promotion << 12)
+                else:
+                    append(move)
+
+        if us == WHITE:
+            single_moves = pawns << 8 & ~self.occupied & BB_ALL
+            double_moves = single_moves << 8 & ~self.occupied & BB_DOUBLE_PUSH_RANKS[us]
+            step = -8
+        else:
+            single_moves = pawns >> 8 & ~self.occupied
+            double_moves = single_moves >> 8 & ~self.occupied & BB_DOUBLE_PUSH_RANKS[us]
+            step = 8
+        single_moves &= to_mask
+        double_moves &= to_mask
+
+        while single_moves:
+            to_square = single_moves.bit_length() - 1
+            single_moves ^= BB_SQUARES[to_square]
+            from_square = to_square + step
+            if blockers & BB_SQUARES[from_square] and not BB_RAYS[king][from_square] & BB_SQUARES[to_square]:
+                continue
+            move = from_square | to_square << 6
+            if to_square < 8 or to_square >= 56:
+                for promotion in PROMOTIONS:
+                    append(move | promotion << 12)
+            else:
+                append(move)
+
+        while double_moves:
+            to_square = double_moves.bit_length() - 1
+            double_moves ^= BB_SQUARES[to_square]
+            from_square = to_square + 2 * step
+            if blockers & BB_SQUARES[from_square] and not BB_RAYS[king][from_square] & BB_SQUARES[to_square]:
+                continue
+            append(from_square | to_square << 6)
+
+        if self.ep:
+            self._en_passant(moves, from_mask, to_mask, king)
+
+    def _en_passant(self, moves, from_mask, to_mask, king):
+        ep = self.ep
+        if not BB_SQUARES[ep] & to_mask or BB_SQUARES[ep] & self.occupied:
+            return
+        us = self.turn
+        capturers = (self.bb[PAWN] & self.occ[us] & from_mask &
+                     BB_PAWN_ATTACKS[us ^ 1][ep] & BB_EP_RANKS[us])
+        while capturers:
+            from_square = capturers.bit_length() - 1
+            capturers ^= BB_SQUARES[from_square]
+            move = from_square | ep << 6
+            if king is None or self._ep_safe(move):
+                moves.append(move)
+
+    def _castling(self, moves, from_mask, to_mask):
+        us = self.turn
+        backrank = BB_BACKRANKS[us]
+        king = self.occ[us] & self.bb[KING] & backrank & from_mask
+        king &= -king
+        if not king:
+            return
+        king_square = king.bit_length() - 1
+        occupied = self.occupied
+        candidates = self.castling & backrank & to_mask
+        while candidates:
+            candidate = candidates.bit_length() - 1
+            candidates ^= BB_SQUARES[candidate]
+            rook = BB_SQUARES[candidate]
+            a_side = rook < king
+            king_to = (chess.BB_FILE_C if a_side else chess.BB_FILE_G) & backrank
+            rook_to = (chess.BB_FILE_D if a_side else chess.BB_FILE_F) & backrank
+            king_to_square = king_to.bit_length() - 1
+            king_path = between(king_square, king_to_square)
+            rook_path = between(candidate, rook_to.bit_length() - 1)
+            if ((occupied ^ king ^ rook) & (king_path | rook_path | king_to | rook_to) or
+                    self._attacked_for_king(king_path | king, occupied ^ king) or
+                    self._attacked_for_king(king_to, occupied ^ king ^ rook ^ rook_to)):
+                continue
+            moves.append(king_square | king_to_square << 6)
+
+    def _attacked_for_king(self, path, occupied):
+        them = self.turn ^ 1
+        while path:
+            square = path.bit_length() - 1
+            path ^= BB_SQUARES[square]
+            if self.attackers(them, square, occupied):
+                return True
+        return False
+
+    def _evasions(self, moves, king, checkers, blockers, from_mask, to_mask):
+        # Mirrors chess.Board._generate_evasions: king moves first, then
+        # captures of or blocks against a single checker
+        bb = self.bb
+        sliders = checkers & (bb[BISHOP] | bb[ROOK] | bb[QUEEN])
+        attacked = 0
+        while sliders:
+            checker = sliders.bit_length() - 1
+            sliders ^= BB_SQUARES[checker]
+            attacked |= BB_RAYS[king][checker] & ~BB_SQUARES[checker]
+
+        if BB_SQUARES[king] & from_mask:
+            targets = BB_KING_ATTACKS[king] & ~self.occ[self.turn] & ~attacked & to_mask
+            while targets:
+                to_square = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to_square]
+                if self._king_safe(to_square):
+                    moves.append(king | to_square << 6)
+
+        checker = checkers.bit_length() - 1
+        if BB_SQUARES[checker] == checkers:
+            target = between(king, checker) | checkers
+            self._pseudo_legal(moves, BB_ALL & ~bb[KING] & from_mask, target & to_mask, king, blockers)
+            if self.ep and not BB_SQUARES[self.ep] & target:
+                last_double = self.ep + (-8 if self.turn == WHITE else 8)
+                if last_double == checker:
+                    self._en_passant(moves, from_mask, to_mask, king)
+
+    # --- Conversion ---
+
+    def to_move(self, move):
+        return decode_move(move)
+
+    def from_move(self, move):
+        return encode_move(move)
+
+
+def perft(board, depth):
+    if depth == 1:
+        return len(board.generate_moves())
+    nodes = 0
+    for move in board.generate_moves():
+        undo = board.make(move)
+        nodes += perft(board, depth - 1)
+        board.unmake(move, undo)
+    return nodes
+
+
+def chess_perft(board, depth):
+    if depth == 1:
+        return board.legal_moves.count()
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += chess_perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def zero_weights():
+    return [[[0] * 64 for _ in range(7)] for _ in (BLACK, WHITE)]
+
+
+# Standard perft positions: start, "Kiwipete" and the other chessprogramming.org test positions
+PERFT_POSITIONS = [
+    chess.STARTING_FEN,
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+    "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+]
+
+
+def validate(depth=3, random_positions=2000, seed=0):
+    """Perft and move-order equality against chess.Board; returns the number of failures."""
+    failures = 0
+    for fen in PERFT_POSITIONS:
+        board = chess.Board(fen)
+        start = time.perf_counter()
+        expected = chess_perft(board, depth)
+        chess_time = time.perf_counter() - start
+        start = time.perf_counter()
+        got = perft(SearchBoard(board, zero_weights()), depth)
+        search_time = time.perf_counter() - start
+        status = "ok" if got == expected else "MISMATCH"
+        failures += got != expected
+        print(f"perft({depth}) {got:>9,} vs {expected:>9,} {status}  "
+              f"{expected / chess_time:,.0f} vs {got / search_time:,.0f} leaves/s  {fen}")
+
+    # Move lists in identical order, plus make/unmake round trips of key and score
+    rng = random.Random(seed)
+    mismatches = 0
+    for _ in range(random_positions):
+        board = chess.Board(rng.choice(PERFT_POSITIONS))
+        for _ in range(rng.randint(0, 40)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        search = SearchBoard(board, zero_weights())
+        expected = [encode_move(m) for m in board.legal_moves]
+        captures = [encode_move(m) for m in board.generate_legal_captures()]
+        if list(search.generate_moves()) != expected or list(search.generate_captures()) != captures:
+            mismatches += 1
+            continue
+        for move in search.generate_moves():
+            board.push(decode_move(move))
+            undo = search.make(move)
+            if search.key != chess.polyglot.zobrist_hash(board) or search.is_check() != board.is_check():
+                mismatches += 1
+            search.unmake(move, undo)
+            board.pop()
+    print(f"move order / hash: {mismatches} mismatches in {random_positions:,} random positions")
+    return failures + mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate the search board against chess.Board with perft.")
+    parser.add_argument("-d", "--depth", type=int, default=3)
+    parser.add_argument("-n", "--positions", type=int, default=2000)
+    args = parser.parse_args()
+    raise SystemExit(1 if validate(args.depth, args.positions) else 0)
@@ -0,0 +1,82 @@
+import argparse
+import json
+import os
+import time
+
+import chess
+
+from chess_ai import ChessBot
+from search_board import PERFT_POSITIONS
+
+# Regression check for search refactors. ChessBot searches the perft
+# positions to fixed depths and the node count, move and score of every
+# search are compared with the values recorded in search_nodes.json. Changes
+# that only make the search faster must leave all of them identical; changes
+# to move ordering, pruning or the eval are expected to move them, and the
+# file is then rewritten with --update. The built-in tables are used so a
+# retuned eval_weights.json doesn't count as a difference.
+
+EXPECTED_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "search_nodes.json")
+MAX_DEPTH = 4
+
+
+def search_results(depth=MAX_DEPTH, positions=PERFT_POSITIONS):
+    """{fen: {depth: {"nodes", "move", "score"}}} for fixed-depth searches from depth 1 up."""
+    results = {}
+    for fen in positions:
+        results[fen] = {}
+        for d in range(1, depth + 1):
+            # A new bot per search, so no move ordering memory carries over
+            bot = ChessBot("hard")
+            bot.use_weights(None)
+            bot.depth = d
+            move = bot.get_move(chess.Board(fen))
+            results[fen][str(d)] = {"nodes": bot.nodes, "move": move.uci(), "score": bot.last_score}
+    return results
+
+
+def compare(expected, results):
+    """Lines describing every search whose result differs from the recorded one."""
+    differences = []
+    for fen, depths in results.items():
+        for d, got in depths.items():
+            want = expected.get(fen, {}).get(d)
+            if want is None:
+                differences.append(f"depth {d} not recorded  {fen}")
+            elif got != want:
+                changed = ", ".join(f"{key} {want[key]} -> {got[key]}" for key in got if got[key] != want.get(key))
+                differences.append(f"depth {d}: {changed}  {fen}")
+    return differences
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check that fixed-depth search node counts, moves and scores are unchanged.")
+    parser.add_argument("-d", "--depth", type=int, default=MAX_DEPTH)
+    parser.add_argument("--expected", default=EXPECTED_PATH)
+    parser.add_argument("--update", action="store_true", help="record the current results as the expected ones")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    results = search_results(args.depth)
+    elapsed = time.perf_counter() - start
+    nodes = sum(r["nodes"] for depths in results.values() for r in depths.values())
+    print(f"{len(results)} positions, depths 1-{args.depth}: {nodes:,} nodes in {elapsed:.2f}s")
+
+    if args.update:
+        with open(args.expected, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=1)
+            f.write("\n")
+        print(f"Wrote {args.expected}")
+        return 0
+
+    with open(args.expected, encoding="utf-8") as f:
+        expected = json.load(f)
+    differences = compare(expected, results)
+    for line in differences:
+        print(line)
+    print(f"{len(differences)} searches differ" if differences else "all searches match")
+    return 1 if differences else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
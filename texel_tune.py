@@ -0,0 +1,265 @@
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+import chess
+import chess.pgn
+
+from batch_eval import CHUNK_SIZE, PIECE_TYPES, bitboards_to_tensor, board_bitboards
+from chess_ai import ChessBot, WEIGHTS_PATH
+
+# Texel-style tuning of ChessBot's material and piece-square values. Quiet
+# positions from PGN games are labelled with the game result, and the weights
+# are fitted so that sigmoid(K * eval) predicts that result (logistic loss).
+# The static eval is linear in the weights, so every position becomes one
+# row of a feature matrix: per piece type the piece count difference and 64
+# piece-square entries (+1 for a White piece on the table square, -1 for a
+# Black piece on the mirrored one). A gradient step over a million positions
+# is then two matrix products instead of a million Python evaluations.
+# Mobility is not tuned and enters as a fixed per-position offset.
+# A piece's count column is the sum of its 64 table columns, so a material
+# value and a constant added to its table are interchangeable. Every step is
+# therefore kept at zero mean within each table: the tables only shape where
+# pieces stand, and level shifts go into the material values.
+
+OPENING_PLIES = 8     # Skipped at the start of every game (mostly book moves)
+RESULTS = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+FEATURES = len(PIECE_TYPES) * 65
+VALIDATION_SPLIT = 0.1
+
+
+def quiet_positions(game):
+    """Yields the positions of a game worth tuning on.
+
+    A position is quiet when the side to move is not in check, the move
+    played from it is not a capture or promotion, and it doesn't follow a
+    capture (no recapture pending), so its static eval is meaningful.
+    """
+    board = game.board()
+    after_capture = False
+    for ply, move in enumerate(game.mainline_moves()):
+        capture = board.is_capture(move)
+        if (ply >= OPENING_PLIES and not capture and not move.promotion
+                and not after_capture and not board.is_check()):
+            yield board
+        after_capture = capture
+        board.push(move)
+
+
+def extract_positions(paths, limit=None):
+    """(bitboards, mobility, results) arrays for the quiet positions in PGN files.
+
+    mobility is ChessBot's mobility term for each position (White's point of
+    view) and results the game result from White's side: 1, 0.5 or 0.
+    """
+    bitboards, mobility, results = [], [], []
+    for path in paths:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            while limit is None or len(results) < limit:
+                game = chess.pgn.read_game(f)
+                if game is None:
+                    break
+                result = RESULTS.get(game.headers.get("Result"))
+                if result is None:
+                    continue
+                for board in quiet_positions(game):
+                    bitboards.append(board_bitboards(board))
+                    moves = board.legal_moves.count() * 2
+                    mobility.append(moves if board.turn == chess.WHITE else -moves)
+                    results.append(result)
+    if limit is not None:
+        del bitboards[limit:], mobility[limit:], results[limit:]
+    return (np.array(bitboards, dtype=np.uint64).reshape(-1, 12),
+            np.array(mobility, dtype=np.float32),
+            np.array(results, dtype=np.float32))
+
+
+def feature_matrix(bitboards):
+    """(N, FEATURES) int8 rows such that features . weight_vector(bot) == bot.material_score."""
+    tensor = bitboards_to_tensor(bitboards)
+    squares = np.arange(64)
+    # Table index i is square i ^ 56 for White (a8 first) and square i for Black
+    tables = tensor[:, :6][:, :, squares ^ 56] - tensor[:, 6:]
+    counts = tensor[:, :6].sum(axis=2, dtype=np.int8) - tensor[:, 6:].sum(axis=2, dtype=np.int8)
+    return np.concatenate([counts[:, :, None], tables], axis=2).reshape(len(bitboards), FEATURES)
+
+
+def weight_vector(bot):
+    weights = np.zeros((len(PIECE_TYPES), 65), dtype=np.float64)
+    for i, piece_type in enumerate(PIECE_TYPES):
+        weights[i, 0] = bot.piece_values[piece_type]
+        weights[i, 1:] = bot.piece_tables[piece_type]
+    return weights.reshape(-1)
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+def _log_loss(pred, results):
+    pred = np.clip(pred, 1e-7, 1 - 1e-7)
+    return float(-np.mean(results * np.log(pred) + (1 - results) * np.log(1 - pred)))
+
+
+def scores(features, offsets, weights):
+    out = np.empty(len(features), dtype=np.float64)
+    for start in range(0, len(features), CHUNK_SIZE):
+        chunk = features[start:start + CHUNK_SIZE].astype(np.float32)
+        out[start:start + len(chunk)] = chunk @ weights.astype(np.float32)
+    return out + offsets
+
+
+def fit_scale(evals, results):
+    """The K in sigmoid(K * eval) that best fits the results for fixed evals (golden section search)."""
+    lo, hi = math.log(1e-4), math.log(0.05)
+    ratio = (math.sqrt(5) - 1) / 2
+    loss = lambda log_k: _log_loss(_sigmoid(math.exp(log_k) * evals), results)
+    a, b = hi - ratio * (hi - lo), lo + ratio * (hi - lo)
+    fa, fb = loss(a), loss(b)
+    for _ in range(40):
+        if fa < fb:
+            hi, b, fb = b, a, fa
+            a = hi - ratio * (hi - lo)
+            fa = loss(a)
+        else:
+            lo, a, fa = a, b, fb
+            b = lo + ratio * (hi - lo)
+            fb = loss(b)
+    return math.exp((lo + hi) / 2)
+
+
+def gradient(features, offsets, results, weights, k):
+    """Loss and gradient of the mean log loss over all positions."""
+    grad = np.zeros(FEATURES, dtype=np.float64)
+    loss = 0.0
+    w = weights.astype(np.float32)
+    for start in range(0, len(features), CHUNK_SIZE):
+        chunk = features[start:start + CHUNK_SIZE].astype(np.float32)
+        pred = _sigmoid(k * (chunk @ w + offsets[start:start + len(chunk)]))
+        target = results[start:start + len(chunk)]
+        loss += _log_loss(pred, target) * len(chunk)
+        grad += chunk.T @ (pred - target)
+    return loss / len(features), grad * k / len(features)
+
+
+def anchor_tables(step):
+    """step with each piece-square table part shifted to zero mean, so the table means never change."""
+    step = step.reshape(len(PIECE_TYPES), 65).copy()
+    step[:, 1:] -= step[:, 1:].mean(axis=1, keepdims=True)
+    return step.reshape(-1)
+
+
+def tune(features, offsets, results, weights, k, epochs=300, rate=1.0, l2=0.0, validate=None, log_every=25):
+    """Adam on the log loss, with optional L2 pull towards the starting weights.
+
+    Steps go through anchor_tables(), so each table keeps its starting mean.
+
+    With a validate(weights) -> loss callback, the weights with the lowest
+    validation loss seen at a log step are returned (early stopping).
+    """
+    start_weights = weights.copy()
+    weights = weights.copy()
+    best = (validate(weights), weights.copy()) if validate else None
+    m = np.zeros_like(weights)
+    v = np.zeros_like(weights)
+    beta1, beta2 = 0.9, 0.999
+    for epoch in range(1, epochs + 1):
+        loss, grad = gradient(features, offsets, results, weights, k)
+        grad += l2 * (weights - start_weights)
+        m = beta1 * m + (1 - beta1) * grad
+        v = beta2 * v + (1 - beta2) * grad * grad
+        step = m / (1 - beta1 ** epoch) / (np.sqrt(v / (1 - beta2 ** epoch)) + 1e-12)
+        weights -= rate * anchor_tables(step)
+        if log_every and (epoch % log_every == 0 or epoch == epochs):
+            if validate:
+                held_out = validate(weights)
+                print(f"epoch {epoch:4}: loss {loss:.6f}, validation {held_out:.6f}")
+                if held_out < best[0]:
+                    best = (held_out, weights.copy())
+            else:
+                print(f"epoch {epoch:4}: loss {loss:.6f}")
+    return best[1] if validate else weights
+
+
+def save_weights(path, weights, info):
+    weights = np.rint(weights.reshape(len(PIECE_TYPES), 65)).astype(int)
+    symbols = [chess.piece_symbol(piece_type).upper() for piece_type in PIECE_TYPES]
+    data = {
+        "piece_values": {s: int(w[0]) for s, w in zip(symbols, weights)},
+        # Rows from White's side, a8 first, like the tables in chess_ai.py
+        "piece_tables": {s: w[1:].reshape(8, 8).tolist() for s, w in zip(symbols, weights)},
+        "tuning": info,
+    }
+    # One table row per line so the file reads like the tables in chess_ai.py
+    tables = list(data["piece_tables"].items())
+    lines = ["{", f' "piece_values": {json.dumps(data["piece_values"])},', ' "piece_tables": {']
+    for i, (symbol, rows) in enumerate(tables):
+        lines.append(f'  "{symbol}": [')
+        lines += [f"   {json.dumps(row)}" + ("," if j < len(rows) - 1 else "") for j, row in enumerate(rows)]
+        lines.append("  ]" + ("," if i < len(tables) - 1 else ""))
+    lines += [" },", f' "tuning": {json.dumps(data["tuning"])}', "}"]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune ChessBot's material and piece-square values on PGN games.")
+    parser.add_argument("inputs", nargs="+", help="PGN files, or one .npz written by --save-positions")
+    parser.add_argument("-o", "--output", default=WEIGHTS_PATH)
+    parser.add_argument("-n", "--positions", type=int, default=None, help="maximum positions to extract")
+    parser.add_argument("--save-positions", help="also save the extracted positions to this .npz")
+    parser.add_argument("--epochs", type=int, default=300)
+    parser.add_argument("--rate", type=float, default=1.0, help="Adam step size in centipawns")
+    parser.add_argument("--l2", type=float, default=0.0, help="pull towards the starting weights")
+    parser.add_argument("--builtin", action="store_true", help="start from the built-in tables, not the current weights file")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if len(args.inputs) == 1 and args.inputs[0].endswith(".npz"):
+        data = np.load(args.inputs[0])
+        bitboards, mobility, results = data["bitboards"], data["mobility"], data["results"]
+    else:
+        bitboards, mobility, results = extract_positions(args.inputs, args.positions)
+        if args.save_positions:
+            np.savez_compressed(args.save_positions, bitboards=bitboards, mobility=mobility, results=results)
+    if len(results) < 2:
+        parser.error("not enough quiet positions with a game result found")
+    features = feature_matrix(bitboards)
+    print(f"{len(results):,} positions loaded in {time.perf_counter() - start:.1f}s")
+
+    # Hold out a random tenth of the positions to check for overfitting
+    order = np.random.default_rng(0).permutation(len(results))
+    split = len(order) - max(1, int(len(order) * VALIDATION_SPLIT))
+    train, held_out = order[:split], order[split:]
+    f_train, m_train, r_train = features[train], mobility[train], results[train]
+
+    bot = ChessBot()
+    if args.builtin:
+        bot.use_weights(None)
+    weights = weight_vector(bot)
+    k = fit_scale(scores(f_train, m_train, weights), r_train)
+    print(f"K = {k:.6f}")
+
+    f_held, m_held, r_held = features[held_out], mobility[held_out], results[held_out]
+
+    def validation_loss(w):
+        return _log_loss(_sigmoid(k * scores(f_held, m_held, w)), r_held)
+
+    before = validation_loss(weights)
+    start = time.perf_counter()
+    tuned = tune(f_train, m_train, r_train, weights, k, args.epochs, args.rate, args.l2, validation_loss)
+    elapsed = time.perf_counter() - start
+    after = validation_loss(tuned)
+    print(f"tuned {args.epochs} epochs in {elapsed:.1f}s; validation loss {before:.6f} -> {after:.6f}")
+
+    for i, piece_type in enumerate(PIECE_TYPES[:-1]):
+        print(f"  {chess.piece_name(piece_type):6} {weights[i * 65]:7.0f} -> {tuned[i * 65]:7.0f}")
+    save_weights(args.output, tuned, {"positions": int(len(results)), "k": k, "epochs": args.epochs,
+                                      "validation_loss": [before, after]})
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
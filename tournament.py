@@ -0,0 +1,300 @@
+import argparse
+import math
+import multiprocessing
+import random
+import sys
+import time
+
+import chess
+import chess.pgn
+
+from chess_ai import ChessBot
+
+# Headless self-play between two ChessBot configurations. Each game runs in a
+# worker process with its own chess clock, so a configuration that searches
+# deeper than its time budget allows loses on time instead of looking stronger.
+
+# Balanced openings used when no position list is given
+OPENINGS = [
+    chess.STARTING_FEN,
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/pp1ppppp/8/2p5/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/pppp1ppp/4p3/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/pp1ppppp/2p5/8/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/ppp1pppp/8/3p4/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkb1r/pppppppp/5n2/8/3P4/8/PPP1PPPP/RNBQKBNR w KQkq - 1 2",
+    "rnbqkbnr/pppppppp/8/8/2P5/8/PP1PPPPP/RNBQKBNR b KQkq - 0 1",
+    "rnbqkbnr/pppppppp/8/8/8/5N2/PPPPPPPP/RNBQKB1R b KQkq - 1 1",
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5",
+    "rnbqkb1r/ppp1pppp/5n2/3p4/2PP4/8/PP2PPPP/RNBQKBNR w KQkq - 1 3",
+]
+
+MAX_PLIES = 300  # Adjudicate as a draw after this many plies
+RANDOM_PLIES = 4  # Random moves played after the opening, so no two pairs start alike
+MAX_OPENING_TRIES = 100
+
+
+def parse_engine(spec):
+    """Parses "level=hard,depth=3"-style specs into a config dict."""
+    config = {"name": spec}
+    for part in spec.split(","):
+        key, sep, value = part.partition("=")
+        if not sep:
+            # A bare word is the difficulty level
+            key, value = "level", key
+        key = key.strip()
+        value = value.strip()
+        if value.lower() in ("on", "true", "yes"):
+            config[key] = True
+        elif value.lower() in ("off", "false", "no"):
+            config[key] = False
+        else:
+            try:
+                config[key] = int(value)
+            except ValueError:
+                try:
+                    config[key] = float(value)
+                except ValueError:
+                    config[key] = value
+    config.setdefault("level", "hard")
+    return config
+
+
+def make_bot(config):
+    bot = ChessBot(config["level"])
+    for key, value in config.items():
+        if key in ("name", "level"):
+            continue
+        if key == "weights":
+            # weights=path/to/eval_weights.json, or weights=off for the built-in tables
+            bot.use_weights(value)
+            continue
+        # Feature toggles map onto ChessBot attributes
+        if key == "cache" or not hasattr(bot, key):
+            raise ValueError(f"unknown ChessBot option '{key}'")
+        setattr(bot, key, value)
+    return bot
+
+
+def play_game(task):
+    index, fen, white_cfg, black_cfg, base_time, increment = task
+    bots = {chess.WHITE: make_bot(white_cfg), chess.BLACK: make_bot(black_cfg)}
+    clocks = {chess.WHITE: base_time, chess.BLACK: base_time}
+    nodes = {chess.WHITE: 0, chess.BLACK: 0}
+    think = {chess.WHITE: 0.0, chess.BLACK: 0.0}
+    board = chess.Board(fen)
+    game = chess.pgn.Game()
+    game.setup(board)
+    node = game
+    result, termination = None, "normal"
+
+    while result is None:
+        outcome = board.outcome(claim_draw=True)
+        if outcome:
+            result = outcome.result()
+            break
+        if board.ply() >= MAX_PLIES:
+            result, termination = "1/2-1/2", "adjudication"
+            break
+
+        side = board.turn
+        start = time.perf_counter()
+        move = bots[side].get_move(board)
+        elapsed = time.perf_counter() - start
+        nodes[side] += bots[side].nodes
+        think[side] += elapsed
+
+        if base_time:
+            clocks[side] -= elapsed
+            if clocks[side] < 0:
+                result, termination = ("0-1" if side == chess.WHITE else "1-0"), "time forfeit"
+                break
+            clocks[side] += increment
+
+        node = node.add_variation(move)
+        if base_time:
+            node.set_clock(clocks[side])
+        board.push(move)
+
+    game.headers["Event"] = "ChessBot self-play"
+    game.headers["Round"] = str(index + 1)
+    game.headers["White"] = white_cfg["name"]
+    game.headers["Black"] = black_cfg["name"]
+    game.headers["Result"] = result
+    game.headers["Termination"] = termination
+    if base_time:
+        game.headers["TimeControl"] = f"{base_time:g}+{increment:g}"
+
+    forfeit = None
+    if termination == "time forfeit":
+        forfeit = chess.WHITE if result == "0-1" else chess.BLACK
+    return {
+        "index": index,
+        "pgn": str(game),
+        "result": result,
+        "forfeit": forfeit,
+        "nodes": nodes,
+        "think": think,
+    }
+
+
+def elo_difference(pair_scores):
+    """Elo difference with a 95% confidence margin from game-pair scores.
+
+    pair_scores holds the average score of each opening pair (0, 0.25, ...,
+    1 for the pentanomial 0-2 points of two games with colors reversed; a
+    pair with one game so far counts with that game's score). The two games
+    of a pair are strongly correlated, so the variance is taken over pairs,
+    not over single games.
+    """
+    pairs = len(pair_scores)
+    if pairs == 0:
+        return 0.0, float("inf")
+    mean = sum(pair_scores) / pairs
+    variance = sum((s - mean) ** 2 for s in pair_scores) / pairs
+    margin = 1.96 * math.sqrt(variance / pairs)
+
+    def to_elo(p):
+        p = min(max(p, 1e-6), 1 - 1e-6)
+        return -400 * math.log10(1 / p - 1)
+
+    elo = to_elo(mean)
+    return elo, (to_elo(mean + margin) - to_elo(mean - margin)) / 2
+
+
+def load_openings(path):
+    openings = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                board = chess.Board(line)
+            except ValueError:
+                try:
+                    board, _ = chess.Board.from_epd(line)
+                except ValueError:
+                    continue
+            openings.append(board.fen())
+    return openings
+
+
+def pair_openings(openings, pairs, rng):
+    """One distinct start position per game pair.
+
+    ChessBot is deterministic, so two pairs from the same position would
+    replay the same games and count as independent results. Openings are
+    dealt without replacement (reshuffled when they run out) and each gets
+    RANDOM_PLIES random moves on top.
+    """
+    fens, used, deck = [], set(), []
+    while len(fens) < pairs:
+        if not deck:
+            deck = list(openings)
+            rng.shuffle(deck)
+        opening = deck.pop()
+        for _ in range(MAX_OPENING_TRIES):
+            board = chess.Board(opening)
+            for _ in range(RANDOM_PLIES):
+                moves = list(board.legal_moves)
+                if not moves:
+                    break
+                board.push(rng.choice(moves))
+            if not board.is_game_over() and board.epd() not in used:
+                used.add(board.epd())
+                fens.append(board.fen())
+                break
+        else:
+            raise ValueError(f"cannot find {pairs} distinct start positions")
+    return fens
+
+
+def run_match(engine_a, engine_b, games=100, base_time=60.0, increment=0.5, openings=None,
+              processes=None, pgn_out=None, seed=None, out=sys.stdout):
+    rng = random.Random(seed)
+    openings = openings or OPENINGS
+    fens = pair_openings(openings, (games + 1) // 2, rng)
+    tasks = []
+    for i in range(games):
+        # Each start position is played twice with colors reversed
+        fen = fens[i // 2]
+        a_white = i % 2 == 0
+        white, black = (engine_a, engine_b) if a_white else (engine_b, engine_a)
+        tasks.append((i, fen, white, black, base_time, increment))
+
+    points = 0.0
+    pair_points = {}  # pair index -> [points, games] for engine A
+    wins = draws = losses = 0
+    forfeits = {"A": 0, "B": 0}
+    nodes = {"A": 0, "B": 0}
+    think = {"A": 0.0, "B": 0.0}
+    start = time.perf_counter()
+
+    with multiprocessing.Pool(processes) as pool:
+        for done, res in enumerate(pool.imap_unordered(play_game, tasks), 1):
+            a_white = res["index"] % 2 == 0
+            a_color = chess.WHITE if a_white else chess.BLACK
+            score = {"1-0": 1.0, "0-1": 0.0}.get(res["result"], 0.5)
+            if not a_white:
+                score = 1.0 - score
+            points += score
+            pair = pair_points.setdefault(res["index"] // 2, [0.0, 0])
+            pair[0] += score
+            pair[1] += 1
+            wins += score == 1.0
+            draws += score == 0.5
+            losses += score == 0.0
+
+            for label, color in (("A", a_color), ("B", not a_color)):
+                nodes[label] += res["nodes"][color]
+                think[label] += res["think"][color]
+                forfeits[label] += res["forfeit"] == color
+
+            if pgn_out:
+                print(res["pgn"], file=pgn_out, end="\n\n", flush=True)
+            elo, margin = elo_difference([p / n for p, n in pair_points.values()])
+            print(f"[{done}/{games}] +{wins} ={draws} -{losses}  Elo {elo:+.1f} +/- {margin:.1f}", file=out, flush=True)
+
+    elapsed = time.perf_counter() - start
+    elo, margin = elo_difference([p / n for p, n in pair_points.values()])
+    # Pentanomial counts: complete pairs by A's points (0, 0.5, 1, 1.5, 2)
+    pentanomial = [0] * 5
+    for p, n in pair_points.values():
+        if n == 2:
+            pentanomial[int(p * 2)] += 1
+    print(f"\nA: {engine_a['name']}\nB: {engine_b['name']}", file=out)
+    print(f"Score A: {points:.1f}/{games} (+{wins} ={draws} -{losses})", file=out)
+    print(f"Pairs by A's points 0/0.5/1/1.5/2: {' '.join(map(str, pentanomial))}", file=out)
+    print(f"Elo difference (A - B): {elo:+.1f} +/- {margin:.1f} (95%)", file=out)
+    print(f"Games/hour: {games / elapsed * 3600:.0f}", file=out)
+    for label in ("A", "B"):
+        nps = nodes[label] / think[label] if think[label] > 0 else 0
+        print(f"{label}: avg NPS {nps:.0f}, time forfeits {forfeits[label]}", file=out)
+    return {"elo": elo, "margin": margin, "points": points, "games": games,
+            "wins": wins, "draws": draws, "losses": losses, "pentanomial": pentanomial,
+            "forfeits": forfeits}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play ChessBot configurations against each other.")
+    parser.add_argument("engine_a", help='e.g. "hard" or "level=hard,depth=4"')
+    parser.add_argument("engine_b", help='e.g. "medium"')
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("--tc", default="60+0.5", help="base+increment seconds per side, 0 for no clock")
+    parser.add_argument("--openings", help="FEN/EPD file, one position per line")
+    parser.add_argument("-j", "--processes", type=int, default=None)
+    parser.add_argument("--pgn", default="tournament.pgn", help="where to write the games")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    base, _, inc = args.tc.partition("+")
+    openings = load_openings(args.openings) if args.openings else None
+    with open(args.pgn, "w", encoding="utf-8") as pgn_out:
+        run_match(parse_engine(args.engine_a), parse_engine(args.engine_b), args.games,
+                  float(base), float(inc or 0), openings, args.processes, pgn_out, args.seed)
+
+
+if __name__ == "__main__":
+    main()